@@ -1,9 +1,28 @@
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
 from h5pp.models import *
 
 
-class LibrariesAdmin(admin.ModelAdmin):
+##
+# Change list leaving out the list_defer columns of the model admin, the large columns
+# the list doesn't show. The change form still loads the whole row.
+##
+class DeferredChangeList(ChangeList):
+
+    def get_queryset(self, request):
+        return super(DeferredChangeList, self).get_queryset(request).defer(*self.model_admin.list_defer)
+
+
+class DeferredListAdmin(admin.ModelAdmin):
+    list_defer = ()
+
+    def get_changelist(self, request, **kwargs):
+        return DeferredChangeList
+
+
+class LibrariesAdmin(DeferredListAdmin):
     list_display = ('title', 'library_id')
+    list_defer = ('semantics', 'preloaded_js', 'preloaded_css', 'drop_library_css')
     ordering = ('title', 'library_id')
     readonly_fields = ('library_id', 'major_version', 'minor_version', 'patch_version')
     exclude = ('restricted', 'runnable')
@@ -21,8 +40,9 @@ class LibrariesLanguageAdmin(admin.ModelAdmin):
 admin.site.register(h5p_libraries_languages, LibrariesLanguageAdmin)
 
 
-class ContentsAdmin(admin.ModelAdmin):
+class ContentsAdmin(DeferredListAdmin):
     list_display = ('title', 'author', 'content_type')
+    list_defer = ('json_contents', 'filtered', 'meta_keywords', 'meta_description')
     ordering = ('title', 'author')
     readonly_fields = ('content_id', 'main_library_id')
     exclude = ('disable',)
@@ -50,3 +70,12 @@ class EventsAdmin(admin.ModelAdmin):
 
 
 admin.site.register(h5p_events, EventsAdmin)
+
+
+class EventsDailyAdmin(admin.ModelAdmin):
+    list_display = ('day', 'type', 'sub_type', 'library_name', 'library_version', 'num')
+    ordering = ('-day', 'type', 'sub_type')
+    readonly_fields = ('day', 'type', 'sub_type', 'library_name', 'library_version', 'num')
+
+
+admin.site.register(h5p_events_daily, EventsDailyAdmin)
@@ -0,0 +1,14 @@
+from django.apps import AppConfig
+from django.core import checks
+from django.core.signals import request_started
+
+
+class H5PPConfig(AppConfig):
+    name = 'h5pp'
+
+    def ready(self):
+        from h5pp.checks import check_libraries_cache
+        from h5pp.h5p.h5preaper import H5PReaper
+        checks.register(check_libraries_cache, checks.Tags.caches)
+        # Starts the periodic file reaper when H5P_REAPER_INTERVAL is set
+        request_started.connect(H5PReaper.autostart, dispatch_uid='h5pp_reaper_start')
@@ -0,0 +1,12 @@
+##
+# Benchmark suites of the H5P operations, run with the h5p_benchmark management command
+##
+from h5pp.benchmarks.package import PackageBenchmark
+from h5pp.benchmarks.render import RenderBenchmark
+from h5pp.benchmarks.storage import StorageBenchmark
+
+SUITES = {
+    RenderBenchmark.name: RenderBenchmark,
+    PackageBenchmark.name: PackageBenchmark,
+    StorageBenchmark.name: StorageBenchmark,
+}
@@ -0,0 +1,135 @@
+##
+# Benchmarks of the author-facing package operations on synthetic .h5p packages:
+# validation, installation, export and cloning of a content
+##
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+
+from h5pp.h5p.h5pclasses import H5PDjango
+from h5pp.models import h5p_contents
+
+SEMANTICS = [
+    {'name': 'text', 'type': 'text', 'tags': ['p', 'strong', 'em']},
+    {'name': 'images', 'type': 'list', 'field': {'name': 'image', 'type': 'image'}},
+]
+
+
+class PackageBenchmark:
+    name = 'package'
+    options = ('libraries', 'files', 'media_size')
+
+    ##
+    # libraries: number of libraries in the package, each one preloading the next one
+    # files: number of media files in the content folder
+    # media_size: size in bytes of each media file
+    ##
+    def __init__(self, libraries=10, files=20, media_size=100 * 1024):
+        self.libraries = max(libraries, 1)
+        self.files = files
+        self.media_size = media_size
+        self.packages = 0
+        # Files and folders created in the storage, removed at the end of the run
+        self.created = list()
+
+    def params(self):
+        return {'libraries': self.libraries, 'files': self.files, 'media_size': self.media_size}
+
+    ##
+    # Write a package to target. Every package gets its own library names, so that each
+    # installation is a new one.
+    ##
+    def build_package(self, target):
+        self.packages += 1
+        names = ['H5P.PackageBenchmark%sx%s' % (self.packages, index) for index in range(self.libraries)]
+        with zipfile.ZipFile(str(target), 'w', zipfile.ZIP_DEFLATED) as package:
+            package.writestr('h5p.json', json.dumps({
+                'title': 'Package benchmark', 'language': 'en', 'mainLibrary': names[0], 'embedTypes': ['div'],
+                'preloadedDependencies': [{'machineName': names[0], 'majorVersion': 1, 'minorVersion': 0}],
+            }))
+            package.writestr('content/content.json', json.dumps({
+                'text': '<p>Package <strong>benchmark</strong></p>',
+                'images': [{'path': 'images/file-%s.png' % index, 'mime': 'image/png'} for index in range(self.files)],
+            }))
+            for index in range(self.files):
+                package.writestr('content/images/file-%s.png' % index, os.urandom(self.media_size))
+
+            for index, name in enumerate(names):
+                folder = '%s-1.0/' % name
+                self.created.append(self.root / 'libraries' / folder)
+                library = {
+                    'title': 'Package benchmark %s' % index, 'machineName': name, 'majorVersion': 1, 'minorVersion': 0,
+                    'patchVersion': 0, 'runnable': 1 if index == 0 else 0,
+                    'preloadedJs': [{'path': 'scripts/benchmark.js'}], 'preloadedCss': [{'path': 'styles/benchmark.css'}],
+                }
+                if index + 1 < len(names):
+                    library['preloadedDependencies'] = [{'machineName': names[index + 1], 'majorVersion': 1,
+                                                         'minorVersion': 0}]
+                package.writestr(folder + 'library.json', json.dumps(library))
+                package.writestr(folder + 'semantics.json', json.dumps(SEMANTICS))
+                package.writestr(folder + 'scripts/benchmark.js', 'H5P.Benchmark%s = function () {};\n' % index * 500)
+                package.writestr(folder + 'styles/benchmark.css', '.h5p-benchmark-%s { color: red; }\n' % index * 500)
+
+    def upload(self):
+        (self.root / 'tmp').mkdir(exist_ok=True)
+        folder = Path(tempfile.mkdtemp(prefix='benchmark-', dir=str(self.root / 'tmp')))
+        self.created.append(folder)
+        self.build_package(folder / 'benchmark.h5p')
+        self.interface = H5PDjango(self.user)
+        self.validator = self.interface.h5pGetInstance('validator', folder, folder / 'benchmark.h5p')
+
+    def install(self):
+        self.upload()
+        if not self.validator.is_valid_package(False, False):
+            raise Exception('The synthetic package is not valid')
+        self.storage = self.interface.h5pGetInstance('storage')
+
+    def save_package(self):
+        self.storage.save_package(None, None, False, {'disable': 0, 'title': 'Package benchmark'})
+        self.content_id = str(self.storage.contentId)
+        self.created.append(self.root / 'content' / self.content_id)
+
+    def load_content(self):
+        self.core = H5PDjango(self.user).h5pGetInstance('core')
+        self.content = self.core.load_content(self.content_id)
+        self.content['id'] = self.content_id
+        self.content['filtered'] = ''
+        # Computes the dependencies of the content the export packs
+        self.core.filter_parameters(self.content)
+        self.export = H5PDjango(self.user).h5pGetInstance('export')
+        self.created.append(self.root / 'exports' / ('%s-%s.h5p' % (self.content['slug'], self.content_id)))
+
+    def clone_target(self):
+        self.clone_id = h5p_contents.objects.order_by('-content_id').values_list('content_id', flat=True)[0] + 1
+        self.core.fs.delete_dir_recursive(self.root / 'content' / str(self.clone_id))
+        self.created.append(self.root / 'content' / str(self.clone_id))
+
+    def run(self, runner):
+        self.root = Path(settings.H5P_STORAGE_ROOT)
+        self.user = User.objects.create(username='h5p-benchmark')
+        try:
+            runner.measure('is_valid_package', lambda: self.validator.is_valid_package(False, False), self.upload)
+            runner.measure('save_package', self.save_package, self.install)
+            runner.measure('create_export_file', lambda: self.export.create_export_file(self.content),
+                           self.load_content)
+            runner.measure('clone_content', lambda: self.core.fs.clone_content(self.content_id, self.clone_id),
+                           self.clone_target)
+        finally:
+            self.cleanup()
+        return runner
+
+    ##
+    # The synthetic rows are rolled back, their files have to be removed
+    ##
+    def cleanup(self):
+        for path in set(self.created):
+            if path.is_dir():
+                shutil.rmtree(str(path), ignore_errors=True)
+            elif path.exists():
+                path.unlink()
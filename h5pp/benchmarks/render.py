@@ -0,0 +1,128 @@
+##
+# Benchmarks of the content render path on synthetic libraries and contents
+##
+import json
+
+from django.contrib.auth.models import User
+from django.test import RequestFactory
+
+from h5pp.h5p.h5pclasses import H5PDjango
+from h5pp.h5p.h5pmodule import h5p_load, include_h5p, h5p_embed
+from h5pp.models import h5p_contents, h5p_libraries, h5p_libraries_libraries
+
+
+class RenderBenchmark:
+    name = 'render'
+    options = ('libraries', 'depth', 'size')
+
+    ##
+    # libraries: number of libraries, each one preloading the next one
+    # depth: nesting level of the sub-contents in the content parameters, at most libraries - 1
+    # size: number of text items at each level of the parameters
+    ##
+    def __init__(self, libraries=10, depth=3, size=50):
+        self.libraries = max(libraries, 1)
+        self.depth = max(min(depth, self.libraries - 1), 0)
+        self.size = size
+
+    def params(self):
+        return {'libraries': self.libraries, 'depth': self.depth, 'size': self.size}
+
+    def library_name(self, index):
+        return 'H5P.Benchmark%s' % index
+
+    def create_libraries(self):
+        libraries = list()
+        for index in range(self.libraries):
+            semantics = [
+                {'name': 'text', 'type': 'text', 'tags': ['p', 'strong', 'em', 'a']},
+                {'name': 'items', 'type': 'list', 'field': {'name': 'item', 'type': 'text', 'tags': ['p']}},
+            ]
+            if index + 1 < self.libraries:
+                semantics.append({'name': 'child', 'type': 'library', 'optional': True,
+                                  'options': ['%s 1.0' % self.library_name(index + 1)]})
+            libraries.append(h5p_libraries.objects.create(
+                machine_name=self.library_name(index),
+                title='Benchmark %s' % index,
+                major_version=1,
+                minor_version=0,
+                patch_version=index,
+                runnable=1 if index == 0 else 0,
+                embed_types='div, iframe' if index == 0 else '',
+                preloaded_js=['scripts/benchmark-%s.js' % index, 'scripts/benchmark-%s-extra.js' % index],
+                preloaded_css=['styles/benchmark-%s.css' % index],
+                semantics=json.dumps(semantics),
+            ))
+
+        for library, required in zip(libraries, libraries[1:]):
+            h5p_libraries_libraries.objects.create(library_id=library.library_id,
+                                                   required_library_id=required.library_id,
+                                                   dependency_type='preloaded')
+        return libraries
+
+    def content_params(self, level=0):
+        params = {
+            'text': '<p>Level <strong>%s</strong> of the <em>benchmark</em> content</p>' % level,
+            'items': ['<p>Item %s of level %s with some text to filter</p>' % (i, level) for i in range(self.size)],
+        }
+        if level < self.depth:
+            params['child'] = {'library': '%s 1.0' % self.library_name(level + 1),
+                               'params': self.content_params(level + 1)}
+        return params
+
+    def setup(self):
+        self.user = User.objects.create(username='h5p-benchmark')
+        self.library = self.create_libraries()[0]
+        self.content = h5p_contents.objects.create(
+            title='Benchmark content',
+            json_contents=json.dumps(self.content_params()),
+            embed_type='div',
+            main_library_id=self.library.library_id,
+            filtered='',
+            slug='h5p-benchmark-content',
+        )
+        self.content_id = str(self.content.content_id)
+        # Fills the filtered parameters and the content dependencies
+        self.core().filter_parameters(self.core().load_content(self.content_id))
+
+    def core(self):
+        return H5PDjango(self.user).h5pGetInstance('core')
+
+    def request(self):
+        request = RequestFactory().get('/h5p/content/', {'contentId': self.content_id})
+        request.user = self.user
+        return request
+
+    def run(self, runner):
+        self.setup()
+        state = dict()
+
+        def render():
+            request = self.request()
+            h5p_load(request)
+            include_h5p(request)
+
+        def embed():
+            request = self.request()
+            h5p_load(request)
+            h5p_embed(request)
+
+        def load_content(cold):
+            if cold:
+                h5p_contents.objects.filter(content_id=self.content_id).update(filtered='')
+            state['core'] = self.core()
+            state['content'] = state['core'].load_content(self.content_id)
+
+        def load_dependencies():
+            state['core'] = self.core()
+            state['dependencies'] = state['core'].load_content_dependencies(self.content_id, 'preloaded')
+
+        runner.measure('h5p_load+include_h5p', render)
+        runner.measure('h5p_embed', embed)
+        runner.measure('filter_parameters cold', lambda: state['core'].filter_parameters(state['content']),
+                       lambda: load_content(True))
+        runner.measure('filter_parameters warm', lambda: state['core'].filter_parameters(state['content']),
+                       lambda: load_content(False))
+        runner.measure('get_dependencies_files', lambda: state['core'].get_dependencies_files(state['dependencies']),
+                       load_dependencies)
+        return runner
@@ -0,0 +1,107 @@
+##
+# Measures H5P operations: wall time, database queries and memory allocations,
+# and reports them as JSON so the results of two commits can be compared.
+##
+import datetime
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Not available on Windows, the peak RSS is not reported
+    resource = None
+
+import django
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class BenchmarkRunner:
+
+    def __init__(self, suite, repeat=5, params=None):
+        self.suite = suite
+        self.repeat = repeat
+        self.params = params or dict()
+        self.results = list()
+
+    ##
+    # Time repeat runs of func, calling setup before each of them outside of the measure.
+    # The queries and allocations are taken from an additional traced run.
+    ##
+    def measure(self, name, func, setup=None):
+        timings = list()
+        for i in range(self.repeat):
+            if setup is not None:
+                setup()
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+
+        if setup is not None:
+            setup()
+        io = self.io_counters()
+        # The queries log is bounded, a full one would not count the queries of the traced run
+        connection.queries_log.clear()
+        tracemalloc.start()
+        try:
+            with CaptureQueriesContext(connection) as queries:
+                func()
+            retained, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        read, written = [None if io is None else after - before for before, after in zip(io, self.io_counters())]
+
+        result = {
+            'name': name,
+            'repeat': self.repeat,
+            'min': min(timings),
+            'median': statistics.median(timings),
+            'mean': statistics.mean(timings),
+            'max': max(timings),
+            'queries': len(queries),
+            'retained': retained,
+            'peak': peak,
+            'read': read,
+            'written': written,
+            'max_rss': self.max_rss(),
+        }
+        self.results.append(result)
+        return result
+
+    ##
+    # Bytes read and written by the process so far, None when the platform doesn't count them
+    ##
+    @staticmethod
+    def io_counters():
+        try:
+            with open('/proc/self/io') as f:
+                counters = dict(line.split(': ') for line in f.read().splitlines())
+            return int(counters['rchar']), int(counters['wchar'])
+        except (IOError, KeyError, ValueError):
+            return None
+
+    ##
+    # Peak resident set size of the process, in kilobytes on Linux
+    ##
+    @staticmethod
+    def max_rss():
+        if resource is None:
+            return None
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    def report(self):
+        return {
+            'suite': self.suite,
+            'created_at': datetime.datetime.utcnow().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'params': self.params,
+            'results': self.results,
+        }
+
+    def to_json(self):
+        return json.dumps(self.report(), indent=2)
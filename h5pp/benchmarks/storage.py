@@ -0,0 +1,82 @@
+##
+# Benchmark of the storage of the contents parameters, plain and compressed
+# (H5P_COMPRESS_CONTENTS): row size, writes and reads of the parameters columns
+##
+import json
+
+from django.contrib.auth.models import User
+from django.db.models import Avg
+from django.db.models.functions import Length
+from django.test.utils import override_settings
+
+from h5pp.benchmarks.render import RenderBenchmark
+from h5pp.h5p.h5pclasses import H5PDjango
+from h5pp.models import h5p_contents, h5p_libraries
+
+
+class StorageBenchmark:
+    name = 'storage'
+    options = ('contents', 'depth', 'size')
+
+    ##
+    # contents: number of contents written and read by each operation
+    # depth, size: shape of the parameters of the contents, see RenderBenchmark
+    ##
+    def __init__(self, contents=20, depth=3, size=50):
+        self.contents = max(contents, 1)
+        self.depth = max(depth, 0)
+        self.size = size
+
+    def params(self):
+        return {'contents': self.contents, 'depth': self.depth, 'size': self.size}
+
+    def setup(self):
+        self.user = User.objects.create(username='h5p-benchmark')
+        self.library = h5p_libraries.objects.create(machine_name='H5P.StorageBenchmark', title='Storage benchmark',
+                                                    major_version=1, minor_version=0, patch_version=0, runnable=1,
+                                                    preloaded_js=[], preloaded_css=[], semantics='[]')
+        self.text = json.dumps(RenderBenchmark(self.depth + 1, self.depth, self.size).content_params())
+        self.ids = list()
+
+    def clear(self):
+        h5p_contents.objects.filter(content_id__in=self.ids).delete()
+        self.ids = list()
+
+    def write(self):
+        for index in range(self.contents):
+            self.ids.append(h5p_contents.objects.create(
+                title='Storage benchmark %s' % index,
+                json_contents=self.text,
+                main_library_id=self.library.library_id,
+                filtered=self.text,
+                slug='h5p-storage-benchmark-%s' % index,
+            ).content_id)
+
+    def read(self):
+        list(h5p_contents.objects.filter(content_id__in=self.ids).values_list('json_contents', 'filtered'))
+
+    def load_content(self):
+        framework = H5PDjango(self.user)
+        for content_id in self.ids:
+            framework.loadContent(content_id)
+
+    ##
+    # Average size of the stored parameters columns of a content
+    ##
+    def row_size(self):
+        sizes = h5p_contents.objects.filter(content_id__in=self.ids).aggregate(
+            params=Avg(Length('json_contents')), filtered=Avg(Length('filtered')))
+        return int(sizes['params'] + sizes['filtered'])
+
+    def run(self, runner):
+        self.setup()
+        for mode, compress in [('plain', False), ('compressed', True)]:
+            with override_settings(H5P_COMPRESS_CONTENTS=compress):
+                results = [runner.measure('write %s' % mode, self.write, self.clear)]
+                results.append(runner.measure('read %s' % mode, self.read))
+                results.append(runner.measure('loadContent %s' % mode, self.load_content))
+                row_size = self.row_size()
+                for result in results:
+                    result['row_size'] = row_size
+                self.clear()
+        return runner
@@ -0,0 +1,29 @@
+##
+# System checks of the H5P settings
+##
+from django.conf import settings
+from django.core import checks
+
+# Cache backends keeping their entries in the memory of each process
+LOCAL_CACHE_BACKENDS = ('django.core.cache.backends.locmem.LocMemCache',)
+
+
+##
+# The libraries version invalidating the editor caches is kept in the H5P_CACHE cache:
+# a process-local cache only sees the library changes made by its own process.
+##
+def check_libraries_cache(app_configs, **kwargs):
+    alias = getattr(settings, 'H5P_CACHE', 'default')
+    if alias not in settings.CACHES:
+        return [checks.Error('H5P_CACHE is set to %r, which is not a cache of the CACHES setting.' % alias,
+                             id='h5pp.E001')]
+
+    if settings.CACHES[alias].get('BACKEND') in LOCAL_CACHE_BACKENDS:
+        return [checks.Warning(
+            'The %r cache used by H5P (H5P_CACHE) is local to each process.' % alias,
+            hint='With several worker processes, a library installed, updated or deleted by one of them is not '
+                 'seen by the editor of the others for up to H5P_CACHE_TIMEOUT seconds. Set H5P_CACHE to a cache '
+                 'shared by all the processes (memcached, redis, database), or silence h5pp.W001 when the site '
+                 'runs a single process.',
+            id='h5pp.W001')]
+    return []
@@ -0,0 +1,79 @@
+##
+# Model fields of the H5P tables
+##
+import base64
+import zlib
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Q, Value
+
+# Start of the stored text of a compressed value, never the start of a JSON text
+COMPRESSED_PREFIX = 'zlib:'
+
+
+##
+# Text stored zlib compressed (and base64 encoded) when H5P_COMPRESS_CONTENTS is set and the
+# text is at least H5P_COMPRESS_MIN_SIZE characters long. Compressed and plain values are both
+# read back transparently, so the setting can be changed at any time.
+##
+class CompressedTextField(models.TextField):
+
+    @staticmethod
+    def compressing():
+        return getattr(settings, 'H5P_COMPRESS_CONTENTS', False)
+
+    @staticmethod
+    def compress(value):
+        if value is None or value.startswith(COMPRESSED_PREFIX) or \
+                len(value) < getattr(settings, 'H5P_COMPRESS_MIN_SIZE', 1024):
+            return value
+        return COMPRESSED_PREFIX + base64.b64encode(zlib.compress(value.encode('utf8'))).decode('ascii')
+
+    @staticmethod
+    def decompress(value):
+        if value is None or not value.startswith(COMPRESSED_PREFIX):
+            return value
+        return zlib.decompress(base64.b64decode(value[len(COMPRESSED_PREFIX):])).decode('utf8')
+
+    def from_db_value(self, value, expression, connection):
+        return self.decompress(value)
+
+    def to_python(self, value):
+        return self.decompress(super().to_python(value))
+
+    def get_prep_value(self, value):
+        value = super().get_prep_value(value)
+        return self.compress(value) if self.compressing() else value
+
+
+##
+# Store the compressed text fields of all the rows of model compressed or not, batch_size rows
+# at a time. Returns the number of rows written.
+##
+def store_compressed_fields(model, compress, batch_size=500):
+    fields = [field.name for field in model._meta.get_fields() if isinstance(field, CompressedTextField)]
+    queryset = model.objects.order_by('pk')
+    if not compress:
+        # Only the rows holding a compressed value
+        condition = Q()
+        for name in fields:
+            condition |= Q(**{name + '__startswith': COMPRESSED_PREFIX})
+        queryset = queryset.filter(condition)
+
+    count = 0
+    last = None
+    while True:
+        batch = queryset if last is None else queryset.filter(pk__gt=last)
+        rows = list(batch.values_list('pk', *fields)[:batch_size])
+        if not rows:
+            return count
+
+        with transaction.atomic():
+            for row in rows:
+                # Values are written as is, whatever H5P_COMPRESS_CONTENTS is
+                values = dict((name, Value(CompressedTextField.compress(value) if compress else value,
+                                           output_field=models.TextField())) for name, value in zip(fields, row[1:]))
+                model.objects.filter(pk=row[0]).update(**values)
+        count += len(rows)
+        last = rows[-1][0]
@@ -1,19 +1,31 @@
 # Handles all communication with the database
 
 import collections
+import gzip
+import hashlib
 import shutil
 import json
 import re
 import os
 import urllib.parse
 from pathlib import Path
+from threading import Lock
 
 from django.conf import settings
+from h5pp.h5p.h5pmetrics import H5PMetrics
 
 
 class H5PDjangoEditor:
-    global buildBase
-    buildBase = None
+
+    # Built library data payloads, shared by all editor instances of the process.
+    # Entries are dropped when their file in the disk cache is gone or replaced.
+    _libraryDataCache = dict()
+    _libraryDataLock = Lock()
+
+    # Parsed library semantics, valid for the libraries version they were loaded with
+    _semantics = dict()
+    _semanticsVersion = None
+    _semanticsLock = Lock()
 
     ##
     # Constructor for the core editor library
@@ -27,25 +39,32 @@ class H5PDjangoEditor:
             self.editorFilesDir = Path(filesDir) / 'editor'
         else:
             self.editorFilesDir = Path(editorFilesDir) / 'editor'
+        self.libraryDataCacheDir = self.getLibraryDataCacheDir(filesDir)
 
     ##
     # This does alot of the same as getLibraries in library/h5pclasses.py. Use that instead ?
     ##
     def getLibraries(self, request):
+        libraries = None
         if 'libraries[]' in request.POST:
-            lib = dict(request.POST.lists())
-            liblist = list()
-            for name in lib['libraries[]']:
-                liblist.append(name)
             libraries = list()
-            for libraryName in liblist:
+            for libraryName in request.POST.getlist('libraries[]'):
                 matches = re.search('(.+)\s(\d+)\.(\d+)$', libraryName)
                 if matches:
                     libraries.append(
                         {'uberName': libraryName, 'name': matches.group(1), 'majorVersion': matches.group(2),
                          'minorVersion': matches.group(3)})
 
-        libraries = self.storage.getLibraries(libraries if 'libraries' in locals() else None)
+        # The response only changes with the libraries
+        cache = self.storage.getCache()
+        key = 'h5pp_editor_libraries_%s_%s' % (self.storage.getLibrariesVersion(), hashlib.sha1(
+            json.dumps(libraries).encode('utf8')).hexdigest())
+        data = cache.get(key)
+        H5PMetrics.count_cache(hits=int(data is not None), misses=int(data is None))
+        if data is not None:
+            return data
+
+        libraries = self.storage.getLibraries(libraries)
 
         # TODO Remove nonfunctional devmode
         # if self.h5p.development_mode:
@@ -63,7 +82,9 @@ class H5PDjangoEditor:
         #                                 'restricted': libraries[i]['restricted'],
         #                                 'tutorialUrl': libraries[i]['tutorialUrl'], 'isOld': libraries[i]['isOld']}
 
-        return json.dumps(libraries)
+        data = json.dumps(libraries)
+        cache.set(key, data, self.storage.cacheTimeout)
+        return data
 
     ##
     # Get all scripts, css and semantics data for a library
@@ -72,7 +93,13 @@ class H5PDjangoEditor:
         libraries = self.findEditorLibraries(machineName, majorVersion, minorVersion)
         libraryData = dict()
         libraryData['semantics'] = self.h5p.load_library_semantics(machineName, majorVersion, minorVersion)
-        libraryData['language'] = self.getLibraryLanguage(machineName, majorVersion, minorVersion, langageCode)
+
+        # Translations of the library and its editor dependencies
+        versions = [(machineName, majorVersion, minorVersion)]
+        for library in list(libraries.values()):
+            versions.append((library['machine_name'], library['major_version'], library['minor_version']))
+        languages = self.storage.getLanguages(versions, langageCode)
+        libraryData['language'] = self.languageToJson(languages[versions[0]])
 
         # TODO Fix or remove nonfunctional aggregateAssets tech
         # aggregateAssets = self.h5p.aggregateAssets
@@ -116,21 +143,97 @@ class H5PDjangoEditor:
                     # Local file
                     if 'css' not in libraryData:
                         libraryData['css'] = dict()
-                    self.buildCssPath(None, url + os.path.dirname(css['path']) + '/')
+                    base = url + os.path.dirname(css['path']) + '/'
                     libraryData['css'][url + css['path'] + css['version']] = re.sub(
-                        '(?i)url\([\']?(?![a-z]+:|\/+)([^\')]+)[\']?\)', self.buildCssPath,
+                        '(?i)url\([\']?(?![a-z]+:|\/+)([^\')]+)[\']?\)',
+                        lambda matches, base=base: self.buildCssPath(matches, base),
                         self.h5p.fs.get_content(css['path']))
 
         # Add translations for libraries
-        for key, library in list(libraries.items()):
-            language = self.getLibraryLanguage(library['machine_name'], library['major_version'],
-                                               library['minor_version'], langageCode)
+        for version in versions[1:]:
+            language = self.languageToJson(languages[version])
             if language is not None:
-                lang = '; H5PEditor.language["' + library['machine_name'] + '"] = ' + language + ';'
+                lang = '; H5PEditor.language["' + version[0] + '"] = ' + language + ';'
                 libraryData['javascript'][lang] = lang
 
         return json.dumps(libraryData)
 
+    ##
+    # Same as getLibraryData, from the library data cache. Returns a dict with the json
+    # payload, its gzipped version, an etag and the last modified timestamp.
+    # The payload is built and written to the disk cache on the first request.
+    ##
+    def getCachedLibraryData(self, machineName, majorVersion, minorVersion, langageCode, prefix=''):
+        key = hashlib.sha1(json.dumps(
+            [machineName, str(majorVersion), str(minorVersion), langageCode, prefix]).encode('utf8')).hexdigest()
+        path = self.libraryDataCacheDir / (key + '.json')
+
+        try:
+            lastModified = os.stat(path).st_mtime
+        except OSError:
+            lastModified = None
+
+        entry = self._libraryDataCache.get(key)
+        if entry is not None and entry['last_modified'] == lastModified:
+            H5PMetrics.count_cache(hits=1)
+            return entry
+
+        if lastModified is not None:
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+                with open(str(path) + '.gz', 'rb') as f:
+                    compressed = f.read()
+                H5PMetrics.count_bytes(read=len(data) + len(compressed))
+            except OSError:
+                lastModified = None
+
+        H5PMetrics.count_cache(hits=int(lastModified is not None), misses=int(lastModified is None))
+        if lastModified is None:
+            data = self.getLibraryData(machineName, majorVersion, minorVersion, langageCode, prefix).encode('utf8')
+            compressed = gzip.compress(data)
+            lastModified = self.writeLibraryDataCache(path, data, compressed)
+
+        entry = {
+            'data': data,
+            'gzip': compressed,
+            'etag': hashlib.sha1(data).hexdigest(),
+            'last_modified': lastModified
+        }
+        with self._libraryDataLock:
+            self._libraryDataCache[key] = entry
+
+        return entry
+
+    ##
+    # Write a payload and its gzipped version in the disk cache. Files are renamed into
+    # place so other processes never read a partial payload.
+    ##
+    def writeLibraryDataCache(self, path, data, compressed):
+        os.makedirs(self.libraryDataCacheDir, exist_ok=True)
+        for target, content in [(str(path) + '.gz', compressed), (str(path), data)]:
+            tmp = '%s.%s.tmp' % (target, os.getpid())
+            with open(tmp, 'wb') as f:
+                f.write(content)
+            os.replace(tmp, target)
+            H5PMetrics.count_bytes(written=len(content))
+
+        return os.stat(path).st_mtime
+
+    @staticmethod
+    def getLibraryDataCacheDir(filesDir=None):
+        return Path(settings.H5P_STORAGE_ROOT if filesDir is None else filesDir) / 'cachedassets' / 'editor'
+
+    ##
+    # Empty the library data cache. Payloads include the files of all the editor
+    # dependencies, so any library installation or update invalidates the whole cache.
+    ##
+    @classmethod
+    def clearLibraryDataCache(cls, filesDir=None):
+        shutil.rmtree(cls.getLibraryDataCacheDir(filesDir), ignore_errors=True)
+        with cls._libraryDataLock:
+            cls._libraryDataCache.clear()
+
     ##
     # Return all libraries used by the given editor library
     ##
@@ -152,8 +255,12 @@ class H5PDjangoEditor:
         return orderedDependencies
 
     def getLibraryLanguage(self, machineName, majorVersion, minorVersion, langageCode):
-        language = self.storage.getLanguage(machineName, majorVersion, minorVersion, langageCode)
-        return None if language == False else language
+        version = (machineName, majorVersion, minorVersion)
+        return self.languageToJson(self.storage.getLanguages([version], langageCode)[version])
+
+    @staticmethod
+    def languageToJson(language):
+        return None if language is None else json.dumps(language)
 
     ##
     # Create directories for uploaded content
@@ -172,31 +279,53 @@ class H5PDjangoEditor:
         return True
 
     ##
-    # Move uploaded files, remove old files and update library usage
+    # Move uploaded files and remove old files.
+    # Only the files referenced by the new parameters and not by the old ones are
+    # copied, and only the files not referenced anymore are removed.
+    # Returns the added, removed and kept file paths.
     ##
     def processParameters(self, contentId, newLibrary, newParameters, oldLibrary=None, oldParameters=None):
-        newFiles = list()
-        oldFiles = list()
-        field = {'type': 'library'}
-        libraryParams = {'library': self.h5p.library_to_string(newLibrary), 'params': newParameters}
-        self.processField(field, libraryParams, newFiles)
-        if oldLibrary is not None:
-            old_semantics = self.h5p.load_library_semantics(
-                oldLibrary['name'], oldLibrary['majorVersion'],
-                oldLibrary['minorVersion'], oldParameters
-            )
+        self.contentDirectory = self.contentFilesDir / str(contentId)
 
-            #TODO Parameter params unfilled...
-            self.processSemantics(oldFiles, old_semantics)
+        oldFiles = set()
+        if oldLibrary is not None and oldParameters is not None:
+            for params in self.findFiles(oldLibrary, oldParameters):
+                oldFiles.add(params['path'])
 
-            for i in range(0, len(oldFiles)):
-                if not oldFiles[i] in newFiles and not re.search('(?i)^(\w+:\/\/|\.\.\/)', oldFiles[i]):
-                    removeFile = self.contentDirectory + oldFiles[i]
-                    del removeFile
-                    self.storage.removeFile(removeFile)
+        newFiles = set()
+        changes = {'added': list(), 'removed': list(), 'kept': list()}
+        for params in self.findFiles(newLibrary, newParameters):
+            path = self.processFile(params, oldFiles)
+            if path in newFiles:
+                continue
+            newFiles.add(path)
+            changes['kept' if path in oldFiles else 'added'].append(path)
+
+        for path in sorted(oldFiles - newFiles):
+            if re.search('(?i)^(\w+:\/\/|\.\.\/)', path):
+                # Not a file of this content
+                continue
+            removeFile = (self.contentDirectory / path).resolve()
+            if self.contentDirectory.resolve() not in removeFile.parents:
+                continue
+            if os.path.isfile(removeFile):
+                os.remove(removeFile)
+            changes['removed'].append(path)
+
+        return changes
+
+    ##
+    # List the file parameters (dicts with a path) of a library's parameters
+    ##
+    def findFiles(self, library, params):
+        files = list()
+        field = {'type': 'library'}
+        libraryParams = {'library': self.h5p.library_to_string(library), 'params': params}
+        self.processField(field, libraryParams, files)
+        return files
 
     ##
-    # Recursive function that moves the new files in to the h5p content folder and generates a list over the old files
+    # Recursive function that generates a list over the file parameters
     # Also locates all the libraries
     ##
     def processSemantics(self, files, semantics, params):
@@ -212,21 +341,23 @@ class H5PDjangoEditor:
     def processField(self, field, params, files):
         if field['type'] == 'image' or field['type'] == 'file':
             if 'path' in params:
-                self.processFile(params, files)
+                files.append(params)
                 if 'originalImage' in params and 'path' in params['originalImage']:
-                    self.processFile(params['originalImage'], files)
+                    files.append(params['originalImage'])
             return
         elif field['type'] == 'audio' or field['type'] == 'video':
             if isinstance(params, list):
                 for i in range(0, len(params)):
-                    self.processFile(params[i], files)
+                    if 'path' in params[i]:
+                        files.append(params[i])
             return
         elif field['type'] == 'library':
             if 'library' in params and 'params' in params:
                 library = self.libraryFromString(params['library'])
-                semantics = self.h5p.load_library_semantics(library['machineName'], library['majorVersion'],
-                                                            library['minorVersion'])
-                self.processSemantics(files, semantics, params['params'])
+                if library:
+                    semantics = self.getSemantics(library['machineName'], library['majorVersion'],
+                                                  library['minorVersion'])
+                    self.processSemantics(files, semantics, params['params'])
             return
         elif field['type'] == 'group':
             if params:
@@ -241,37 +372,64 @@ class H5PDjangoEditor:
             return
         return
 
-    def processFile(self, params, files):
+    ##
+    # Parsed semantics of a library, kept until the libraries change
+    ##
+    def getSemantics(self, machineName, majorVersion, minorVersion):
+        version = self.storage.getLibrariesVersion()
+        with self._semanticsLock:
+            if H5PDjangoEditor._semanticsVersion != version:
+                H5PDjangoEditor._semantics = dict()
+                H5PDjangoEditor._semanticsVersion = version
+            cache = H5PDjangoEditor._semantics
+
+        key = (machineName, int(majorVersion), int(minorVersion))
+        H5PMetrics.count_cache(hits=int(key in cache), misses=int(key not in cache))
+        if key not in cache:
+            try:
+                semantics = self.h5p.load_library_semantics(machineName, majorVersion, minorVersion)
+            except ValueError:
+                semantics = None
+            with self._semanticsLock:
+                cache[key] = semantics if semantics is not None else list()
+
+        return cache[key]
+
+    ##
+    # Move a file in to the h5p content folder, unless the old parameters already used it.
+    # Editor uploads are moved, files of other contents are copied.
+    # Returns the path of the file in the content folder.
+    ##
+    def processFile(self, params, oldFiles=()):
         editorPath = self.editorFilesDir
 
         matches = re.search(self.h5p.relativePathRegExp, params['path'])
         if matches:
-            source = self.contentDirectory / matches.group(1) / matches.group(4) / matches.group(5)
-            dest = self.contentDirectory / matches.group(5)
-            if os.path.exists(source) and not os.path.exists(dest):
-                shutil.copy(source, dest)
-
             params['path'] = matches.group(5)
-        else:
+            if params['path'] not in oldFiles:
+                source = self.contentDirectory / matches.group(1) / matches.group(4) / matches.group(5)
+                dest = self.contentDirectory / matches.group(5)
+                if os.path.exists(source) and not os.path.exists(dest):
+                    if matches.group(4) == 'editor':
+                        shutil.move(source, dest)
+                    else:
+                        shutil.copy(source, dest)
+        elif params['path'] not in oldFiles:
             oldPath = self.basePath / editorPath / Path(params['path'])
             newPath = self.basePath / self.contentDirectory / params['path']
             if not os.path.exists(newPath) and os.path.exists(oldPath):
-                shutil.copy(oldPath, newPath)
+                shutil.move(oldPath, newPath)
 
-        files.append(params['path'])
+        return params['path']
 
     ##
     # This function will prefix all paths within a css file.
     ##
-    def buildCssPath(self, matches, base=None):
-        global buildBase
-        if base is not None:
-            buildBase = base
-
+    def buildCssPath(self, matches, base):
         if matches is None:
             return
 
-        dirr = re.sub('(css/|styles/|Styles/|Css/)', 'fonts/', buildBase)
+        dirr = re.sub('(css/|styles/|Styles/|Css/)', 'fonts/', base)
         path = dirr + matches.group(1)
 
         return 'url(' + path + ')'
@@ -8,14 +8,12 @@ import re
 
 class H5PEditorFile:
 
-    global name
-    name = None
-
     ##
     # Constructor. Process data for file uploaded through the editor
     ##
     def __init__(self, request, files, framework):
         # TODO Figure out if input sanitazion is needed, especially on 'files'
+        self.name = None
 
         if 'field' not in request.POST or request.POST['field'] is None:
             return
@@ -161,19 +159,18 @@ class H5PEditorFile:
     # Get the name of the current file
     ##
     def getName(self):
-        global name
-        if name is None:
-            name = str(uuid.uuid1())
+        if self.name is None:
+            self.name = str(uuid.uuid1())
 
             # Add extension to name
             if 'data' in locals() or 'data' in globals():
-                name = name + self.extension
+                self.name = self.name + self.extension
             else:
                 matches = re.search('(?i)([a-z0-9]+)$', self.files.name)
                 if matches.group(1):
-                    name = name + '.' + matches.group(1)
+                    self.name = self.name + '.' + matches.group(1)
 
-        return name
+        return self.name
 
     def getFile(self):
         return self.files
@@ -188,7 +185,6 @@ class H5PEditorFile:
     # Print result from file processing
     ##
     def printResult(self):
-        global name
         self.result['path'] = self.getType() + 's/' + self.getName()
-        name = None
+        self.name = None
         return json.dumps(self.result)
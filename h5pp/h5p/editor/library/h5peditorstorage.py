@@ -1,40 +1,101 @@
 ##
 # Handles all communication with the database
 ##
+import json
+from threading import Lock
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import caches
 from django.db import connection
-from h5pp.models import h5p_libraries
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+from h5pp.models import h5p_libraries, h5p_libraries_languages
+from h5pp.h5p.h5pmetrics import H5PMetrics
 
 
 class H5PEditorStorage:
+    # Cache of the library lists and of the libraries version, see H5P_CACHE in the settings.
+    # It must be shared by all the processes of the site, see h5pp.checks
+    cacheAlias = getattr(settings, 'H5P_CACHE', 'default')
+    cacheTimeout = getattr(settings, 'H5P_CACHE_TIMEOUT', 86400)
+    librariesVersionKey = 'h5pp_libraries_version'
+
+    # Parsed language files by (machineName, majorVersion, minorVersion, language),
+    # valid for the libraries version they were loaded with
+    _languages = dict()
+    _languagesVersion = None
+    _languagesLock = Lock()
 
     ##
     # Decides which content types the editor should have
     ##
     def getLibraries(self, libraries=None):
         if libraries is not None:
+            if len(libraries) == 0:
+                return list()
+
+            # Fetch the details of all the requested versions at once
+            versions = Q()
+            for library in libraries:
+                versions |= Q(machine_name=library['name'], major_version=library['majorVersion'],
+                              minor_version=library['minorVersion'])
+            details = dict()
+            for row in h5p_libraries.objects.filter(versions).values(
+                    'machine_name', 'major_version', 'minor_version', 'title', 'runnable', 'restricted', 'tutorial_url'):
+                details[(row['machine_name'], row['major_version'], row['minor_version'])] = row
+
             librariesWithDetails = list()
             for library in libraries:
-                details = h5p_libraries.objects.filter(machine_name=library['name'], major_version=library[
-                                                       'majorVersion'], minor_version=library['minorVersion']).values('title', 'runnable', 'restricted', 'tutorial_url')
-                if len(details) > 0:
-                    details = details[0]
-                    library['tutorialUrl'] = details['tutorial_url']
-                    library['title'] = details['title']
-                    library['runnable'] = details['runnable']
-                    library['restricted'] = True if details[
-                        'restricted'] == 1 else False
+                key = (library['name'], int(library['majorVersion']), int(library['minorVersion']))
+                if key in details:
+                    library['tutorialUrl'] = details[key]['tutorial_url']
+                    library['title'] = details[key]['title']
+                    library['runnable'] = details[key]['runnable']
+                    library['restricted'] = True if details[key]['restricted'] == 1 else False
                     librariesWithDetails.append(library)
 
             return librariesWithDetails
 
-        libraries = list()
-        librariesResult = h5p_libraries.objects.filter(runnable=1, semantics__isnull=False).extra(select={'name': 'machine_name', 'majorVersion': 'major_version', 'minorVersion': 'minor_version', 'tutorialUrl': 'tutorial_url'}).values(
-            'name', 'title', 'majorVersion', 'minorVersion', 'tutorialUrl', 'restricted').order_by('title')
-        for library in librariesResult:
-            libraries.append(library)
+        cache = self.getCache()
+        key = 'h5pp_libraries_%s' % self.getLibrariesVersion()
+        libraries = cache.get(key)
+        H5PMetrics.count_cache(hits=int(libraries is not None), misses=int(libraries is None))
+        if libraries is None:
+            libraries = list()
+            librariesResult = h5p_libraries.objects.filter(runnable=1, semantics__isnull=False).extra(select={'name': 'machine_name', 'majorVersion': 'major_version', 'minorVersion': 'minor_version', 'tutorialUrl': 'tutorial_url'}).values(
+                'name', 'title', 'majorVersion', 'minorVersion', 'tutorialUrl', 'restricted').order_by('title')
+            for library in librariesResult:
+                libraries.append(library)
+            cache.set(key, libraries, self.cacheTimeout)
 
         return libraries
 
+    @classmethod
+    def getCache(cls):
+        return caches[cls.cacheAlias]
+
+    ##
+    # Key identifying the current state of the libraries. Everything cached
+    # from the libraries table is cached under this key.
+    ##
+    @classmethod
+    def getLibrariesVersion(cls):
+        cache = cls.getCache()
+        version = cache.get(cls.librariesVersionKey)
+        if version is None:
+            cache.add(cls.librariesVersionKey, uuid4().hex, None)
+            version = cache.get(cls.librariesVersionKey)
+
+        return version
+
+    ##
+    # Forget everything cached from the libraries table, to be called when libraries change
+    ##
+    @classmethod
+    def invalidateLibraries(cls, **kwargs):
+        cls.getCache().set(cls.librariesVersionKey, uuid4().hex, None)
+
     ##
     # Load language file(JSON) from database.
     # This is used to translate the editor fields(title, description, etc...)
@@ -47,11 +108,57 @@ class H5PEditorStorage:
 			FROM h5p_libraries_languages hlt
 			JOIN h5p_libraries hl ON hl.library_id = hlt.library_id
 			WHERE hl.machine_name = %s AND hl.major_version = %s AND hl.minor_version = %s AND hlt.language_code = %s
-			""" % ("'" + machineName + "'", majorVersion, minorVersion, "'" + language + "'"))
+			""", [machineName, majorVersion, minorVersion, language])
 
         result = self.dictfetchall(cursor)
         return result[0]['language_json'] if len(result) > 0 else False
 
+    ##
+    # Load the language files of several libraries with a single query.
+    # libraries is a list of (machineName, majorVersion, minorVersion). Libraries
+    # not translated in language fall back to english.
+    # Returns the parsed language files by library, None when there is none.
+    ##
+    def getLanguages(self, libraries, language):
+        keys = [(machineName, int(majorVersion), int(minorVersion))
+                for machineName, majorVersion, minorVersion in libraries]
+
+        version = self.getLibrariesVersion()
+        with self._languagesLock:
+            if H5PEditorStorage._languagesVersion != version:
+                H5PEditorStorage._languages = dict()
+                H5PEditorStorage._languagesVersion = version
+            cache = H5PEditorStorage._languages
+
+        missing = [key for key in set(keys) if key + (language,) not in cache]
+        H5PMetrics.count_cache(hits=len(set(keys)) - len(missing), misses=len(missing))
+        if missing:
+            loaded = dict((key, None) for key in missing)
+            codes = [language, 'en']
+            params = list(codes)
+            for key in missing:
+                params.extend(key)
+
+            cursor = connection.cursor()
+            cursor.execute("""
+				SELECT hl.machine_name, hl.major_version, hl.minor_version, hlt.language_code, hlt.language_json
+				FROM h5p_libraries_languages hlt
+				JOIN h5p_libraries hl ON hl.library_id = hlt.library_id
+				WHERE hlt.language_code IN (%s, %s) AND (""" + ' OR '.join(
+                ['(hl.machine_name = %s AND hl.major_version = %s AND hl.minor_version = %s)'] * len(missing)) + ')',
+                params)
+
+            # The requested language wins over the english fallback
+            rows = sorted(cursor.fetchall(), key=lambda row: codes.index(row[3]), reverse=True)
+            for machineName, majorVersion, minorVersion, code, languageJson in rows:
+                loaded[(machineName, majorVersion, minorVersion)] = json.loads(languageJson)
+
+            with self._languagesLock:
+                for key, parsed in list(loaded.items()):
+                    cache[key + (language,)] = parsed
+
+        return dict((tuple(library), cache[key + (language,)]) for library, key in zip(libraries, keys))
+
     ##
     # Returns all rows from a cursor as a dict
     ##
@@ -61,3 +168,11 @@ class H5PEditorStorage:
             dict(list(zip([col[0] for col in desc], row)))
             for row in cursor.fetchall()
         ]
+
+
+post_save.connect(H5PEditorStorage.invalidateLibraries, sender=h5p_libraries, dispatch_uid='h5pp_libraries_saved')
+post_delete.connect(H5PEditorStorage.invalidateLibraries, sender=h5p_libraries, dispatch_uid='h5pp_libraries_deleted')
+post_save.connect(H5PEditorStorage.invalidateLibraries, sender=h5p_libraries_languages,
+                  dispatch_uid='h5pp_libraries_languages_saved')
+post_delete.connect(H5PEditorStorage.invalidateLibraries, sender=h5p_libraries_languages,
+                    dispatch_uid='h5pp_libraries_languages_deleted')
@@ -1,129 +1,278 @@
-##
-# Makes it easy to track events throughout the H5P system
-##
-from django.db.models import F
-from h5pp.models import h5p_events, h5p_counters
-import time
-
-
-class H5PEvent:
-    LOG_NONE = 0
-    LOG_ALL = 1
-    LOG_ACTIONS = 2
-
-    log_level = LOG_ACTIONS
-    log_time = 2592000  # 30 days
-
-    def __init__(self, user, typ, sub_type=None, content_id=None, content_title=None, library_name=None,
-                 library_version=None):
-        self.user = user
-        self.typ = typ
-        self.sub_type = sub_type
-        self.content_id = content_id
-        self.content_title = content_title
-        self.library_name = library_name
-        self.library_version = library_version
-        self.time = int(time.time())
-
-        if self.valid_log_level(typ, sub_type):
-            self.save(self.user)
-
-        if self.valid_stats(typ, sub_type):
-            self.save_stats()
-
-    ##
-    # Determines if the event type should be saved/logged
-    ##
-    def valid_log_level(self, typ, sub_type):
-        if self.log_level == 'LOG_NONE':
-            return False
-        elif self.log_level == 'LOG_ALL':
-            return True
-        else:
-            if self.is_action(typ, sub_type):
-                return True
-            return False
-
-    ##
-    # Check if the event should be included in the statistics counter
-    ##
-    def valid_stats(self, typ, sub_type):
-        if (typ == 'content' and sub_type == 'shortcode insert') or \
-                (typ == 'library' and sub_type is None) or \
-                (typ == 'results' and sub_type == 'content'):
-            return True
-        elif self.is_action(typ, sub_type):
-            return True
-        return False
-
-    ##
-    # Check if event type is an action
-    ##
-    @staticmethod
-    def is_action(typ, sub_type):
-        if (typ == 'content' and sub_type in ['create', 'create upload', 'update', 'update upload', 'upgrade',
-                                              'delete'] or typ == 'library' and sub_type in ['create', 'update']):
-            return True
-        return False
-
-    ##
-    # A helper which makes it easier for systems to have the data
-    # Add all relevant properties to a assoc, array
-    # There are no NONE values. Empty string or 0 is used instead
-    ##
-    def get_data_array(self):
-        return {
-            'created_at': self.time,
-            'type': self.typ, 'sub_type': '' if not self.sub_type else self.sub_type,
-            'content_id': 0 if not self.content_id else self.content_id,
-            'content_title': '' if not self.content_title else self.content_title,
-            'library_name': '' if not self.library_name else self.library_name,
-            'library_version': '' if not self.library_version else self.library_version
-        }
-
-    ##
-    # Stores the event data in the database
-    ##
-    def save(self, user):
-
-        # Get data in array format without NONE values
-        data = self.get_data_array()
-
-        # Add user
-        data['user_id'] = user.id
-
-        # Insert into DB
-        self.pid = h5p_events.objects.create(**data)
-
-        return self.pid.id
-
-    ##
-    # Add current event data to statistics counter
-    ##
-    def save_stats(self):
-        atype = self.typ + ' ' + self.sub_type
-
-        # Verify if counter exists
-        current_num = h5p_counters.objects.filter(
-            type=atype,
-            library_name=self.library_name,
-            library_version=self.library_version
-        ).values('num')
-
-        if not current_num.exists():
-            # Insert new counter
-            h5p_counters.objects.create(
-                type=atype,
-                library_name=self.library_name,
-                library_version=self.library_version,
-                num=1
-            )
-        else:
-            # Update counter with num+1
-            counter = h5p_counters.objects.get(
-                type=atype,
-                library_name=self.library_name,
-                library_version=self.library_version
-            )
-            counter.num = F('num') + 1
-            counter.save()
+##
+# Makes it easy to track events throughout the H5P system
+##
+import atexit
+import logging
+from collections import Counter
+from datetime import datetime, timezone
+from threading import Lock
+
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models import F
+from h5pp.models import h5p_events, h5p_events_daily, h5p_counters
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class H5PEvent:
+    LOG_NONE = 0
+    LOG_ALL = 1
+    LOG_ACTIONS = 2
+
+    log_level = getattr(settings, 'H5P_LOG_LEVEL', LOG_ACTIONS)
+    log_time = getattr(settings, 'H5P_EVENT_LOG_TIME', 2592000)  # 30 days
+
+    # Events and counter increments are kept in memory and written in bulk,
+    # either when the buffer is full, when the current request is finished
+    # or when the process exits. While the database can't be written the
+    # buffer keeps at most buffer_max events, the oldest ones are dropped.
+    buffer_size = getattr(settings, 'H5P_EVENT_BUFFER_SIZE', 100)
+    buffer_max = getattr(settings, 'H5P_EVENT_BUFFER_MAX', 10000)
+    _lock = Lock()
+    _events = list()
+    _counters = Counter()
+    # Database the buffered events are written to
+    _database = None
+
+    def __init__(self, user, typ, sub_type=None, content_id=None, content_title=None, library_name=None,
+                 library_version=None):
+        self.user = user
+        self.typ = typ
+        self.sub_type = sub_type
+        self.content_id = content_id
+        self.content_title = content_title
+        self.library_name = library_name
+        self.library_version = library_version
+        self.time = int(time.time())
+
+        if self.valid_log_level(typ, sub_type):
+            self.save(self.user)
+
+        if self.valid_stats(typ, sub_type):
+            self.save_stats()
+
+        if self.pending() >= self.buffer_size:
+            self.flush_or_log()
+
+    ##
+    # Determines if the event type should be saved/logged
+    ##
+    def valid_log_level(self, typ, sub_type):
+        if self.log_level == self.LOG_NONE:
+            return False
+        elif self.log_level == self.LOG_ALL:
+            return True
+        else:
+            if self.is_action(typ, sub_type):
+                return True
+            return False
+
+    ##
+    # Check if the event should be included in the statistics counter
+    ##
+    def valid_stats(self, typ, sub_type):
+        if (typ == 'content' and sub_type == 'shortcode insert') or \
+                (typ == 'library' and sub_type is None) or \
+                (typ == 'results' and sub_type == 'content'):
+            return True
+        elif self.is_action(typ, sub_type):
+            return True
+        return False
+
+    ##
+    # Check if event type is an action
+    ##
+    @staticmethod
+    def is_action(typ, sub_type):
+        if (typ == 'content' and sub_type in ['create', 'create upload', 'update', 'update upload', 'upgrade',
+                                              'delete'] or typ == 'library' and sub_type in ['create', 'update']):
+            return True
+        return False
+
+    ##
+    # A helper which makes it easier for systems to have the data
+    # Add all relevant properties to a assoc, array
+    # There are no NONE values. Empty string or 0 is used instead
+    ##
+    def get_data_array(self):
+        return {
+            'created_at': self.time,
+            'type': self.typ, 'sub_type': '' if not self.sub_type else self.sub_type,
+            'content_id': 0 if not self.content_id else self.content_id,
+            'content_title': '' if not self.content_title else self.content_title,
+            'library_name': '' if not self.library_name else self.library_name,
+            'library_version': '' if not self.library_version else self.library_version
+        }
+
+    ##
+    # Queues the event data for insertion in the database
+    ##
+    def save(self, user):
+
+        # Get data in array format without NONE values
+        data = self.get_data_array()
+
+        # Add user
+        data['user_id'] = user.id if user is not None and user.id else 0
+
+        with self._lock:
+            H5PEvent._events.append(h5p_events(**data))
+            H5PEvent._database = self.database()
+            dropped = self.drop_oldest()
+
+        if dropped:
+            logger.warning('The H5P event buffer is full, %s events were dropped', dropped)
+
+    ##
+    # Add current event data to statistics counter
+    ##
+    def save_stats(self):
+        data = self.get_data_array()
+        key = ((data['type'] + ' ' + data['sub_type']).strip(), data['library_name'], data['library_version'])
+
+        with self._lock:
+            H5PEvent._counters[key] += 1
+            H5PEvent._database = self.database()
+
+    ##
+    # Number of events and counters waiting to be written
+    ##
+    @classmethod
+    def pending(cls):
+        return len(cls._events) + len(cls._counters)
+
+    ##
+    # Remove the oldest events above buffer_max, the lock must be held.
+    # Returns the number of dropped events.
+    ##
+    @classmethod
+    def drop_oldest(cls):
+        dropped = max(0, len(cls._events) - cls.buffer_max)
+        del cls._events[:dropped]
+        return dropped
+
+    ##
+    # Name of the database the events are written to
+    ##
+    @staticmethod
+    def database():
+        return connections[router.db_for_write(h5p_events)].settings_dict['NAME']
+
+    ##
+    # Write all buffered events and counter increments to the database. What
+    # could not be written is put back in the buffers before raising the error.
+    ##
+    @classmethod
+    def flush(cls):
+        with cls._lock:
+            events, cls._events = cls._events, list()
+            counters, cls._counters = cls._counters, Counter()
+
+        try:
+            if events:
+                # Written in a single transaction, all the events or none of them
+                h5p_events.objects.bulk_create(events, batch_size=cls.buffer_size)
+                events = list()
+
+            for key in list(counters):
+                cls.increment_counter(*key, num=counters[key])
+                del counters[key]
+        except Exception:
+            with cls._lock:
+                cls._events[:0] = events
+                cls._counters.update(counters)
+                dropped = cls.drop_oldest()
+            if dropped:
+                logger.warning('The H5P event buffer is full, %s events were dropped', dropped)
+            raise
+
+    ##
+    # Flush without raising, the error is logged and the events stay buffered for the
+    # next flush. Used when nobody could handle the error: after the response is sent,
+    # when the buffer is full or when the process exits.
+    ##
+    @classmethod
+    def flush_or_log(cls, **kwargs):
+        try:
+            cls.flush()
+        except Exception:
+            logger.exception('%s buffered H5P events and counters could not be written', cls.pending())
+
+    ##
+    # Write the events still buffered when the process exits: management commands, shells
+    # and task workers have no finished request. Nothing is written when the process uses
+    # another database than the one of the events, as after the tests.
+    ##
+    @classmethod
+    def flush_at_exit(cls):
+        if cls.pending() and cls._database == cls.database():
+            cls.flush_or_log()
+
+    ##
+    # Increment a counter with a single UPDATE, inserting the row if it does not exist yet
+    ##
+    @classmethod
+    def increment_counter(cls, typ, library_name, library_version, num=1):
+        cls.increment(h5p_counters, num, type=typ, library_name=library_name, library_version=library_version)
+
+    ##
+    # Add num to the row of model matching the (unique) lookup
+    ##
+    @staticmethod
+    def increment(model, num, **lookup):
+        row = model.objects.filter(**lookup)
+        if row.update(num=F('num') + num):
+            return
+
+        try:
+            # The unique key makes concurrent inserts fail instead of duplicating the row
+            with transaction.atomic():
+                model.objects.create(num=num, **lookup)
+        except IntegrityError:
+            row.update(num=F('num') + num)
+
+    ##
+    # Delete events older than the log time, in batches of batch_size rows.
+    # The deleted events are first added to the daily rollup table so the
+    # statistics survive the pruning.
+    ##
+    @classmethod
+    def prune(cls, before=None, batch_size=1000, dry_run=False):
+        if before is None:
+            before = int(time.time()) - cls.log_time
+
+        cls.flush()
+
+        expired = h5p_events.objects.filter(created_at__lt=before)
+        if dry_run:
+            return expired.count()
+
+        deleted = 0
+        while True:
+            with transaction.atomic():
+                batch = list(expired.order_by('created_at').values_list(
+                    'id', 'created_at', 'type', 'sub_type', 'library_name', 'library_version')[:batch_size])
+                if not batch:
+                    break
+
+                rollups = Counter()
+                for event in batch:
+                    day = datetime.fromtimestamp(event[1], timezone.utc).date()
+                    rollups[(day,) + event[2:]] += 1
+
+                for (day, typ, sub_type, library_name, library_version), num in list(rollups.items()):
+                    cls.increment(h5p_events_daily, num, day=day, type=typ, sub_type=sub_type,
+                                  library_name=library_name, library_version=library_version)
+
+                h5p_events.objects.filter(id__in=[event[0] for event in batch]).delete()
+
+            deleted += len(batch)
+
+        return deleted
+
+
+request_finished.connect(H5PEvent.flush_or_log, dispatch_uid='h5pp_event_flush_%s' % __name__)
+atexit.register(H5PEvent.flush_at_exit)
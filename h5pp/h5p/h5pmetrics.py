@@ -0,0 +1,178 @@
+##
+# Instrumentation of the H5P operations: time, database queries, cache hits and misses
+# and file bytes read and written by each call of the H5PDjango and H5PCore methods.
+# Measures are sent with the h5p_operation_measured signal, the sinks of H5P_METRICS_SINKS
+# are connected to it.
+##
+import functools
+import inspect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+from django.dispatch import Signal
+from django.utils.module_loading import import_string
+
+# Sent with operation, a dict of the measures of a finished operation
+h5p_operation_measured = Signal()
+
+_local = threading.local()
+
+
+class H5PMetrics:
+    enabled = getattr(settings, 'H5P_METRICS', False)
+    # Dotted paths of the sink classes receiving the measures
+    sinks = getattr(settings, 'H5P_METRICS_SINKS', ['h5pp.h5p.h5pmetrics.LoggingSink'])
+
+    _instrumented = set()
+    _lock = threading.Lock()
+
+    ##
+    # Operations being measured in the current thread, innermost last
+    ##
+    @staticmethod
+    def stack():
+        if not hasattr(_local, 'operations'):
+            _local.operations = list()
+        return _local.operations
+
+    @classmethod
+    def active(cls):
+        return bool(getattr(_local, 'operations', None))
+
+    ##
+    # Measure the operation name. Measures of nested operations are also counted
+    # in the operations around them.
+    ##
+    @classmethod
+    @contextmanager
+    def measure(cls, name):
+        operation = {'operation': name, 'duration': 0.0, 'queries': 0, 'cache_hits': 0, 'cache_misses': 0,
+                     'bytes_read': 0, 'bytes_written': 0}
+
+        def countQuery(execute, sql, params, many, context):
+            operation['queries'] += 1
+            return execute(sql, params, many, context)
+
+        stack = cls.stack()
+        stack.append(operation)
+        start = time.perf_counter()
+        try:
+            with connection.execute_wrapper(countQuery):
+                yield operation
+        finally:
+            operation['duration'] = time.perf_counter() - start
+            stack.pop()
+            # A failing sink must not break the operation
+            h5p_operation_measured.send_robust(sender=cls, operation=operation)
+
+    @classmethod
+    def count_cache(cls, hits=0, misses=0):
+        for operation in getattr(_local, 'operations', ()):
+            operation['cache_hits'] += hits
+            operation['cache_misses'] += misses
+
+    @classmethod
+    def count_bytes(cls, read=0, written=0):
+        for operation in getattr(_local, 'operations', ()):
+            operation['bytes_read'] += read
+            operation['bytes_written'] += written
+
+    ##
+    # Measure every call of the public methods of klass, under the name Class.method.
+    # Static methods are helpers rather than operations and are left alone.
+    ##
+    @classmethod
+    def instrument(cls, klass):
+        with cls._lock:
+            if klass in cls._instrumented:
+                return
+            cls._instrumented.add(klass)
+
+        for name, attribute in list(vars(klass).items()):
+            if name.startswith('_') or isinstance(attribute, staticmethod):
+                continue
+            if isinstance(attribute, classmethod):
+                setattr(klass, name, classmethod(cls.wrap('%s.%s' % (klass.__name__, name), attribute.__func__)))
+            elif inspect.isfunction(attribute):
+                setattr(klass, name, cls.wrap('%s.%s' % (klass.__name__, name), attribute))
+
+    @classmethod
+    def wrap(cls, name, func):
+        @functools.wraps(func)
+        def measured(*args, **kwargs):
+            with cls.measure(name):
+                return func(*args, **kwargs)
+        return measured
+
+    ##
+    # Instrument the given classes and connect the configured sinks, when H5P_METRICS is set
+    ##
+    @classmethod
+    def setup(cls, *classes):
+        if not cls.enabled:
+            return
+
+        for klass in classes:
+            cls.instrument(klass)
+        for path in cls.sinks:
+            sink = import_string(path)()
+            h5p_operation_measured.connect(sink.record, sender=cls, weak=False, dispatch_uid='h5pp_metrics_%s' % path)
+
+
+##
+# Logs every measured operation to the h5pp.metrics logger
+##
+class LoggingSink:
+    logger = logging.getLogger('h5pp.metrics')
+
+    def record(self, operation, **kwargs):
+        self.logger.info('%(operation)s: %(duration).6fs, %(queries)s queries, %(cache_hits)s cache hits, '
+                         '%(cache_misses)s cache misses, %(bytes_read)s bytes read, %(bytes_written)s bytes written',
+                         operation)
+
+
+##
+# Totals of the measures by operation, rendered in the Prometheus text format by render(),
+# for instance from a view of the project scraped by Prometheus. Totals are kept by process.
+##
+class PrometheusSink:
+    metrics = [
+        ('h5pp_operations_total', None, 'Number of calls of the H5P operation'),
+        ('h5pp_operation_seconds_total', 'duration', 'Time spent in the H5P operation'),
+        ('h5pp_operation_queries_total', 'queries', 'Database queries made by the H5P operation'),
+        ('h5pp_operation_cache_hits_total', 'cache_hits', 'Cache hits of the H5P operation'),
+        ('h5pp_operation_cache_misses_total', 'cache_misses', 'Cache misses of the H5P operation'),
+        ('h5pp_operation_read_bytes_total', 'bytes_read', 'File bytes read by the H5P operation'),
+        ('h5pp_operation_written_bytes_total', 'bytes_written', 'File bytes written by the H5P operation'),
+    ]
+
+    _totals = dict()
+    _lock = threading.Lock()
+
+    def record(self, operation, **kwargs):
+        with self._lock:
+            totals = self._totals.setdefault(operation['operation'], dict((metric, 0) for metric, _, _ in self.metrics))
+            for metric, measure, _ in self.metrics:
+                totals[metric] += 1 if measure is None else operation[measure]
+
+    @classmethod
+    def render(cls):
+        with cls._lock:
+            totals = dict((name, dict(values)) for name, values in cls._totals.items())
+
+        lines = list()
+        for metric, _, description in cls.metrics:
+            lines.append('# HELP %s %s' % (metric, description))
+            lines.append('# TYPE %s counter' % metric)
+            for name in sorted(totals):
+                lines.append('%s{operation="%s"} %s' % (metric, name, totals[name][metric]))
+        return '\n'.join(lines) + '\n'
+
+    @classmethod
+    def reset(cls):
+        with cls._lock:
+            cls._totals.clear()
@@ -0,0 +1,170 @@
+##
+# Removes the files left behind by the editor and the package uploads:
+# editor uploads no content refers to and abandoned tmp files and folders
+##
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.db import close_old_connections
+from h5pp.models import h5p_contents
+
+logger = logging.getLogger(__name__)
+
+
+class H5PReaper:
+    # Files younger than max_age seconds may still be in use by an open editor or a running upload
+    max_age = getattr(settings, 'H5P_REAPER_MAX_AGE', 86400)
+    batch_size = getattr(settings, 'H5P_REAPER_BATCH_SIZE', 1000)
+    # Seconds between two runs of the periodic reaper thread, which is not started when None
+    interval = getattr(settings, 'H5P_REAPER_INTERVAL', None)
+
+    _thread = None
+    _lock = threading.Lock()
+
+    def __init__(self, root=None, max_age=None, batch_size=None, dry_run=False):
+        self.root = Path(settings.H5P_STORAGE_ROOT if root is None else root)
+        self.max_age = self.max_age if max_age is None else max_age
+        self.batch_size = self.batch_size if batch_size is None else batch_size
+        self.dry_run = dry_run
+
+    ##
+    # Remove at most limit orphaned editor files and tmp entries of each kind.
+    # Returns the paths removed (or that would be removed for a dry run).
+    ##
+    def run(self, limit=None):
+        before = time.time() - self.max_age
+        return {
+            'editor': self.remove(self.find_editor_orphans(before), limit),
+            'tmp': self.remove(self.find_tmp_entries(before), limit),
+        }
+
+    ##
+    # Editor uploads older than before that are not referenced by any content, or that were
+    # already copied into the folders of all the contents referencing them
+    ##
+    def find_editor_orphans(self, before):
+        editor = self.root / 'editor'
+        if not editor.is_dir():
+            return
+
+        referenced = None
+        for directory in sorted(editor.iterdir()):
+            if not directory.is_dir():
+                continue
+            for entry in os.scandir(directory):
+                if not entry.is_file() or entry.stat().st_mtime >= before:
+                    continue
+                if referenced is None:
+                    referenced = self.referenced_files()
+                path = directory.name + '/' + entry.name
+                if all((self.root / 'content' / str(contentId) / path).exists()
+                       for contentId in referenced.get(path, ())):
+                    yield Path(entry.path)
+
+    ##
+    # Entries of the tmp folder older than before
+    ##
+    def find_tmp_entries(self, before):
+        tmp = self.root / 'tmp'
+        if not tmp.is_dir():
+            return
+
+        for entry in os.scandir(tmp):
+            if entry.stat(follow_symlinks=False).st_mtime < before:
+                yield Path(entry.path)
+
+    ##
+    # Ids of the contents using each file of the contents parameters, by path
+    ##
+    def referenced_files(self):
+        files = dict()
+        contents = h5p_contents.objects.values_list('content_id', 'json_contents')
+        for contentId, params in contents.iterator(chunk_size=self.batch_size):
+            paths = set()
+            try:
+                self.collect_paths(json.loads(params), paths)
+            except ValueError:
+                continue
+            for path in paths:
+                files.setdefault(path, set()).add(contentId)
+        return files
+
+    def collect_paths(self, params, files):
+        if isinstance(params, dict):
+            if isinstance(params.get('path'), str):
+                files.add(params['path'].split('#')[0])
+            for value in params.values():
+                self.collect_paths(value, files)
+        elif isinstance(params, list):
+            for value in params:
+                self.collect_paths(value, files)
+
+    ##
+    # Delete paths by batches of batch_size, stopping after limit paths
+    ##
+    def remove(self, paths, limit=None):
+        removed = list()
+        batch = list()
+        for path in paths:
+            if limit is not None and len(removed) + len(batch) >= limit:
+                break
+            batch.append(path)
+            if len(batch) >= self.batch_size:
+                removed.extend(self.remove_batch(batch))
+                batch = list()
+        removed.extend(self.remove_batch(batch))
+        return removed
+
+    def remove_batch(self, paths):
+        if not self.dry_run:
+            for path in paths:
+                if path.is_dir() and not path.is_symlink():
+                    shutil.rmtree(path, ignore_errors=True)
+                elif path.exists() or path.is_symlink():
+                    path.unlink()
+        return [str(path) for path in paths]
+
+    ##
+    # Start the periodic reaper thread, removing at most batch_size entries every interval seconds
+    ##
+    @classmethod
+    def start(cls, interval=None):
+        interval = cls.interval if interval is None else interval
+        with cls._lock:
+            if interval is None or (cls._thread is not None and cls._thread.is_alive()):
+                return cls._thread
+
+            def loop():
+                while True:
+                    time.sleep(interval)
+                    cls.run_periodic()
+
+            cls._thread = threading.Thread(target=loop, name='h5p-reaper', daemon=True)
+            cls._thread.start()
+            return cls._thread
+
+    ##
+    # One run of the periodic reaper thread, its errors are logged
+    ##
+    @classmethod
+    def run_periodic(cls):
+        try:
+            cls().run(limit=cls.batch_size)
+        except Exception:
+            logger.exception('The H5P reaper failed')
+        finally:
+            close_old_connections()
+
+    ##
+    # Start the periodic reaper thread with the first request, connected to request_started by the app config
+    ##
+    @classmethod
+    def autostart(cls, **kwargs):
+        if cls.interval is not None and cls._thread is None:
+            cls.start()
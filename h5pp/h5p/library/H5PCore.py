@@ -15,6 +15,7 @@ from h5p.library.H5PExport import H5PExport
 from h5p.library.H5PDefaultStorage import H5PDefaultStorage
 from h5p.library.h5pdevelopment import H5PDevelopment
 from h5p_django import settings
+from h5pp.h5p.h5pmetrics import H5PMetrics
 from django.template.defaultfilters import slugify
 from h5p.library.H5PContentValidator import H5PContentValidator
 
@@ -109,8 +110,8 @@ class H5PCore:
     ##
     # Load content.
     ##
-    def load_content(self, pid):
-        content = self.h5p_framework.loadContent(pid)
+    def load_content(self, pid, params=True):
+        content = self.h5p_framework.loadContent(pid, params)
 
         if content:
             content["library"] = {
@@ -138,6 +139,10 @@ class H5PCore:
                 if self.fs.has_export(content["slug"] + "-" + content["id"] + ".h5p"):
                     return content["filtered"]
 
+        if content.get("params") is None:
+            # Content loaded without its parameters
+            content["params"] = self.h5p_framework.loadContentParams(content["id"])
+
         # Validate and filter against main library semantics.
         validator = H5PContentValidator(self.h5p_framework, self)
         params = {"library": self.library_to_string(content["library"]), "params": json.loads(content["params"])}
@@ -177,21 +182,7 @@ class H5PCore:
     # Generate content slug
     ##
     def generate_content_slug(self, content):
-        slug = slugify(content["title"])
-
-        available = None
-        while not available:
-            if not available:
-                # If not available, add number suffix.
-                # matches = re.search("(.+-)([0-9]+)$", slug) MLD: Capturing groups make no sense..
-                matches = re.search(".+-[0-9]+$", slug)
-                if matches:
-                    slug = matches.group(1) + str(int(matches.group(2)) + 1)
-                else:
-                    slug = slug + "-2"
-
-            available = self.h5p_framework.isContentSlugAvailable(slug)
-        return slug
+        return self.h5p_framework.getAvailableContentSlug(content["title"])
 
     ##
     # Find the files required for self content to work.
@@ -215,7 +206,7 @@ class H5PCore:
     ##
     def get_dependency_assets(self, dependency, ptype, assets, prefix=""):
         # Check if dependency has any files of his type
-        if self.empty(dependency[ptype]) or dependency[ptype][0] == "":
+        if self.empty(dependency[ptype]):
             return
 
         # Check if we should skip CSS.
@@ -225,7 +216,7 @@ class H5PCore:
         for f in dependency[ptype]:
             # TODO Fix path handling
             assets.append(
-                {"path": str(prefix + dependency["path"] + "/" + f.strip(' u\' ')), "version": dependency["version"]})
+                {"path": prefix + dependency["path"] + "/" + f, "version": dependency["version"]})
 
         return assets
 
@@ -242,11 +233,16 @@ class H5PCore:
             if '://' not in asset['path']:
                 # TODO Fix URL handling
                 url = "{}{}{}".format(settings.MEDIA_URL, 'h5pp/', url)
-                urls.append(url)
 
-            # Add version/cache buster if set  # if 'version' in asset:s  #    url = url + asset['version']
+            # Add version/cache buster if set, library files can then be cached forever
+            if 'version' in asset:
+                version = asset['version']
+                if '?' in url and version.startswith('?'):
+                    # The URL already has a query string
+                    version = '&' + version[1:]
+                url = url + version
 
-            # urls.append(url)
+            urls.append(url)
 
         return urls
 
@@ -273,8 +269,8 @@ class H5PCore:
         for key, dependency in list(dependencies.items()):
             if "path" not in dependency:
                 dependency['path'] = 'libraries/' + self.library_to_string(dependency, True)
-                dependency['preloadedJs'] = dependency['preloaded_js'].strip('[]').split(',')
-                dependency['preloadedCss'] = dependency['preloaded_css'].strip('[]').split(',')
+                dependency['preloadedJs'] = dependency['preloaded_js'] or list()
+                dependency['preloadedCss'] = dependency['preloaded_css'] or list()
 
             dependency['version'] = '?ver=' + str(dependency['major_version']) + '.' + str(
                 dependency["minor_version"]) + '.' + str(dependency["patch_version"])
@@ -632,8 +628,12 @@ class H5PCore:
             lib_string = self.library_to_string(library)
 
         if lib_string not in libraryIdMap:
-            libraryIdMap[lib_string] = self.h5p_framework.getLibraryId(library["machineName"], library["majorVersion"],
-                                                                       library["minorVersion"])
+            library_id = self.h5p_framework.getLibraryId(library["machineName"], library["majorVersion"],
+                                                         library["minorVersion"])
+            # Libraries missing during the validation of a package are installed right after it
+            if library_id is None:
+                return None
+            libraryIdMap[lib_string] = library_id
 
         return libraryIdMap[lib_string]
 
@@ -687,6 +687,12 @@ class H5PCore:
     # def get_time_factor(self):
     #     return math.ceil(int(time.time()) / (86400 / 2))
 
+    ##
+    # Recursively remove a directory of the storage, like the extracted package folders.
+    ##
+    def delete_dir_recursive(self, path: Union[Path, str]):
+        return self.fs.delete_dir_recursive(Path(path))
+
     @staticmethod
     def empty(variable):
         if not variable:
@@ -708,7 +714,8 @@ class H5PCore:
             try:
                 if offset > 0:
                     fp.seek(offset)
-                ret = fp.read(maxlen).decode('utf8')
-                return ret
+                data = fp.read(maxlen)
+                H5PMetrics.count_bytes(read=len(data))
+                return data.decode('utf8')
             finally:
                 fp.close()
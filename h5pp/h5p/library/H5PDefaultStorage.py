@@ -1,8 +1,15 @@
+import gzip
 import os
 import uuid
 import shutil
 from django.conf import settings
 from pathlib import Path
+from h5pp.h5p.h5pmetrics import H5PMetrics
+
+try:
+    import brotli
+except ImportError:  # Optional, only the gzip versions are written without it
+    brotli = None
 
 
 ##
@@ -10,6 +17,12 @@ from pathlib import Path
 ##
 class H5PDefaultStorage:
 
+    # Text assets getting precompressed .gz (and .br) siblings when a library is saved
+    precompress = getattr(settings, 'H5P_PRECOMPRESS', True)
+    precompress_extensions = ('.js', '.css', '.json', '.svg')
+    # Compressed files larger than this ratio of the original are not worth serving
+    precompress_ratio = 0.9
+
     def __init__(self, path: Path):
         """
         Constructor for H5PDefaultStorage
@@ -30,17 +43,22 @@ class H5PDefaultStorage:
         # Move library folder
         self.copy_dir_recursive(library['uploadDirectory'], destination)
 
+        if self.precompress:
+            self.precompress_dir(destination)
+
     def save_content(self, source: Path, content_id: int):
         """
         Store the content folder.
         :param source: Path referencing the (temporary) directory containing the content
         :param content_id: content_id to store this content under.
+        :return: True when the content folder was stored
         """
 
         destination = self.path/'content'/str(content_id)
 
         self.delete_dir_recursive(destination)  # Remove any old content
         self.copy_dir_recursive(source, destination)
+        return True
 
     def delete_content(self, content_id: int):
         """Remove content folder."""
@@ -81,7 +99,8 @@ class H5PDefaultStorage:
         else:
             src_path = development_path
 
-        self.copy_dir_recursive(self.path / src_path, target / folder)
+        # The precompressed siblings are not part of the package, their extensions are not whitelisted
+        self.copy_dir_recursive(self.path / src_path, target / folder, False)
 
     def save_export(self, source: Path, export_name: str):
         """
@@ -109,17 +128,81 @@ class H5PDefaultStorage:
         target = self.path/'exports'/filename
         return target.exists()
 
-    def copy_dir_recursive(self, source: Path, destination: Path):
-        """Recursive function for copying directories."""
+    def copy_dir_recursive(self, source: Path, destination: Path, precompressed=True):
+        """
+        Recursive function for copying directories.
+        :param precompressed: Also copy the precompressed siblings of the text assets
+        """
+        source = Path(source)
+        destination = Path(destination)
         if not self.create_dir_recursive(destination):
             raise Exception('Unable to copy')
 
         for file in source.iterdir():
             if file.name != '.git' and file.name != '.gitignore':
-                if (source/file).is_dir():
-                    self.copy_dir_recursive(source / file, destination / file)
+                if file.is_dir():
+                    self.copy_dir_recursive(file, destination / file.name, precompressed)
+                elif not precompressed and self.is_precompressed(file):
+                    continue
                 else:
-                    shutil.copy(str(source/file), str(destination/file))
+                    shutil.copy(str(file), str(destination / file.name))
+                    if H5PMetrics.active():
+                        size = file.stat().st_size
+                        H5PMetrics.count_bytes(read=size, written=size)
+
+    def precompress_dir(self, path: Path, force=False):
+        """
+        Write precompressed siblings of the text assets found in path, for servers serving
+        file.gz or file.br in place of file when the client accepts it.
+        :param path: The directory to walk
+        :param force: Also recompress files having up to date siblings
+        :return: The number of files compressed
+        """
+        count = 0
+        for directory, dirnames, filenames in os.walk(str(path)):
+            for filename in filenames:
+                if filename.lower().endswith(self.precompress_extensions):
+                    count += self.precompress_file(Path(directory)/filename, force)
+        return count
+
+    def is_precompressed(self, path: Path):
+        """Check if the file is a precompressed sibling written by precompress_file."""
+        name = path.name.lower()
+        return name.endswith(('.gz', '.br')) and name[:-3].endswith(self.precompress_extensions)
+
+    def precompress_file(self, path: Path, force=False):
+        """
+        Write the .gz and .br siblings of a file, removing them when compression doesn't help.
+        :return: The number of siblings written
+        """
+        encoders = [('.gz', lambda data: gzip.compress(data, 9))]
+        if brotli is not None:
+            encoders.append(('.br', lambda data: brotli.compress(data, quality=11)))
+
+        stat = path.stat()
+        data = None
+        written = 0
+        for extension, compress in encoders:
+            target = path.with_name(path.name + extension)
+            if not force and target.exists() and target.stat().st_mtime == stat.st_mtime:
+                continue
+
+            if data is None:
+                data = path.read_bytes()
+                H5PMetrics.count_bytes(read=len(data))
+            compressed = compress(data)
+            if len(compressed) >= len(data) * self.precompress_ratio:
+                if target.exists():
+                    target.unlink()
+                continue
+
+            target.write_bytes(compressed)
+            H5PMetrics.count_bytes(written=len(compressed))
+            # Same mtime as the original, servers use it for the Last-Modified of the sibling
+            os.utime(str(target), (stat.st_atime, stat.st_mtime))
+            written += 1
+
+        return written
 
     def create_dir_recursive(self, path: Path):
         """
@@ -148,9 +231,11 @@ class H5PDefaultStorage:
         separator = '-' if format_as_folder_name else ' '
 
         if 'machine_name' in library:
-            return library['machine_name'] + separator + library['major_version'] + '.' + library['minor_version']
+            return library['machine_name'] + separator + str(library['major_version']) + '.' + str(
+                library['minor_version'])
         else:
-            return library['machineName'] + separator + library['majorVersion'] + '.' + library['minorVersion']
+            return library['machineName'] + separator + str(library['majorVersion']) + '.' + str(
+                library['minorVersion'])
 
     ##
     # Save files uploaded through the editor.
@@ -215,15 +300,17 @@ class H5PDefaultStorage:
         :param path: The absolute or relative (to the storage dir) path to the file to read
         :return: The contents of the file
         """
+        path = Path(path)
         if path.is_absolute():
             file_path = path
         else:
             file_path = self.path/path
 
         with file_path.open(mode='rb') as pointer:
-            result = pointer.read().decode('utf8', 'ignore')
+            data = pointer.read()
+        H5PMetrics.count_bytes(read=len(data))
 
-        return result
+        return data.decode('utf8', 'ignore')
 
     ##
     # Will concatenate all JavaScripts and Stylesheets into two files in order
@@ -39,11 +39,11 @@ class H5PExport:
 
         # Update content.json with content from database
         # TODO Rewrite for pathlib
-        with open(str(tmp_path / "content/content.json"), "ab") as f:
+        with open(str(tmp_path / "content/content.json"), "wb") as f:
             f.write(content["params"].encode("utf-8"))
 
         # Make embedType into an array
-        embed_types = content["embedType"].split(", ")
+        embed_types = content.get("embedType", content.get("embed_type", "")).split(", ")
 
         # Build h5p.json
         h5p_json = {"title": content["title"], "language": content["language"] if (
@@ -1,6 +1,8 @@
 ##
 # self class is used for saving H5P files
 ##
+from pathlib import Path
+
 from h5p.library.H5PCore import H5PCore
 
 
@@ -26,7 +28,7 @@ class H5PStorage:
             self.save_libraries()
         if not skip_content:
             base_path = self.h5p_framework.getUploadedH5pFolderPath()
-            current_path = base_path + "/content"
+            current_path = Path(base_path) / "content"
 
             # Save content
             if content is None:
@@ -138,6 +140,10 @@ class H5PStorage:
             # files get regenerated for all content who uses self library.
             self.h5p_framework.clearFilteredParameters(library["libraryId"])
 
+        # Editor payloads are built from the files and translations of the libraries
+        if new_libs or old_libs:
+            self.h5p_framework.clearEditorLibraryCache()
+
         # Tell the user what we"ve done.
         message = ''
         if new_libs and old_libs:
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from h5pp.benchmarks import SUITES
+from h5pp.benchmarks.runner import BenchmarkRunner
+
+
+class Command(BaseCommand):
+    help = 'Run a benchmark suite of the H5P operations on synthetic data and report the results as JSON. ' \
+           'The synthetic data is rolled back at the end of the run.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('suite', choices=sorted(SUITES), help='Benchmark suite to run')
+        parser.add_argument('--repeat', type=int, default=5, help='Number of timed runs of each operation')
+        parser.add_argument('--output', default=None, help='Write the JSON report to OUTPUT instead of stdout')
+        parser.add_argument('--libraries', type=int, default=None, help='Number of synthetic libraries')
+        parser.add_argument('--contents', type=int, default=None, help='Number of synthetic contents')
+        parser.add_argument('--depth', type=int, default=None, help='Nesting level of the synthetic contents')
+        parser.add_argument('--size', type=int, default=None, help='Number of items at each level of the contents')
+        parser.add_argument('--files', type=int, default=None, help='Number of media files in the synthetic packages')
+        parser.add_argument('--media-size', type=int, default=None, help='Size in bytes of each media file')
+
+    def handle(self, *args, **options):
+        suite = SUITES[options['suite']]
+        kwargs = {name: options[name] for name in suite.options if options.get(name) is not None}
+        benchmark = suite(**kwargs)
+        runner = BenchmarkRunner(suite.name, options['repeat'], benchmark.params())
+
+        with transaction.atomic():
+            benchmark.run(runner)
+            transaction.set_rollback(True)
+
+        report = runner.to_json()
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(report)
+            self.stdout.write('%s results written to %s.' % (len(runner.results), options['output']))
+        else:
+            self.stdout.write(report)
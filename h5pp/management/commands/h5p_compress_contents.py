@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from h5pp.fields import store_compressed_fields
+from h5pp.models import h5p_contents
+
+
+class Command(BaseCommand):
+    help = 'Compress the parameters of the existing H5P contents, see H5P_COMPRESS_CONTENTS'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--decompress', action='store_true', help='Store the parameters uncompressed instead')
+        parser.add_argument('--batch-size', type=int, default=500, help='Number of contents written by transaction')
+
+    def handle(self, *args, **options):
+        count = store_compressed_fields(h5p_contents, not options['decompress'], options['batch_size'])
+        self.stdout.write('%s contents %s.' % (count, 'decompressed' if options['decompress'] else 'written'))
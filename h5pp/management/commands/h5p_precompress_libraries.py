@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from pathlib import Path
+
+from h5pp.h5p.library.H5PDefaultStorage import H5PDefaultStorage
+
+
+class Command(BaseCommand):
+    help = 'Write the precompressed versions of the installed H5P libraries text assets'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true',
+                            help='Recompress files whose compressed versions are up to date')
+
+    def handle(self, *args, **options):
+        storage = H5PDefaultStorage(Path(settings.H5P_STORAGE_ROOT))
+        libraries = storage.path / 'libraries'
+        if not libraries.is_dir():
+            self.stdout.write('No libraries installed.')
+            return
+
+        count = 0
+        for library in sorted(libraries.iterdir()):
+            if library.is_dir():
+                count += storage.precompress_dir(library, options['force'])
+
+        self.stdout.write('%s compressed files written.' % count)
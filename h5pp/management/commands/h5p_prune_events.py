@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from h5pp.h5p.h5pevent import H5PEvent
+
+
+class Command(BaseCommand):
+    help = 'Roll up and delete H5P events older than the event log time'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None,
+                            help='Keep events of the last DAYS days (default: H5PEvent.log_time)')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of events deleted per transaction')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report the number of events that would be deleted')
+
+    def handle(self, *args, **options):
+        before = None
+        if options['days'] is not None:
+            before = int(time.time()) - options['days'] * 86400
+
+        count = H5PEvent.prune(before, options['batch_size'], options['dry_run'])
+
+        if options['dry_run']:
+            self.stdout.write('%s events would be deleted.' % count)
+        else:
+            self.stdout.write('%s events deleted.' % count)
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from h5pp.h5p.h5preaper import H5PReaper
+
+
+class Command(BaseCommand):
+    help = 'Delete editor uploads no content refers to and abandoned tmp files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=float, default=None,
+                            help='Keep files modified in the last HOURS hours (default: H5PReaper.max_age)')
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Number of files deleted per batch (default: H5PReaper.batch_size)')
+        parser.add_argument('--limit', type=int, default=None,
+                            help='Stop after deleting LIMIT editor files and LIMIT tmp entries')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only list the files that would be deleted')
+
+    def handle(self, *args, **options):
+        max_age = None
+        if options['hours'] is not None:
+            max_age = options['hours'] * 3600
+
+        reaper = H5PReaper(max_age=max_age, batch_size=options['batch_size'], dry_run=options['dry_run'])
+        removed = reaper.run(options['limit'])
+
+        for kind in ['editor', 'tmp']:
+            if options['verbosity'] > 1 or options['dry_run']:
+                for path in removed[kind]:
+                    self.stdout.write(path)
+            if options['dry_run']:
+                self.stdout.write('%s %s entries would be deleted.' % (len(removed[kind]), kind))
+            else:
+                self.stdout.write('%s %s entries deleted.' % (len(removed[kind]), kind))
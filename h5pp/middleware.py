@@ -0,0 +1,23 @@
+import asyncio
+
+from django.utils.decorators import sync_and_async_middleware
+
+from h5pp.h5p.h5pclasses import H5PDjango
+
+
+##
+# Shares the H5P framework and core instances between all the H5P calls of a request,
+# see H5PDjango.forUser
+##
+@sync_and_async_middleware
+def H5PRequestMiddleware(get_response):
+    if asyncio.iscoroutinefunction(get_response):
+        async def middleware(request):
+            with H5PDjango.requestScope():
+                return await get_response(request)
+    else:
+        def middleware(request):
+            with H5PDjango.requestScope():
+                return get_response(request)
+
+    return middleware
@@ -0,0 +1,37 @@
+# Generated by Django 3.2.25 on 2026-10-19 19:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('h5pp', '0003_auto_20191124_2053'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='h5p_events',
+            name='created_at',
+            field=models.IntegerField(db_index=True),
+        ),
+        migrations.CreateModel(
+            name='h5p_events_daily',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(help_text='Day (UTC) the events were created')),
+                ('type', models.CharField(max_length=63)),
+                ('sub_type', models.CharField(max_length=63)),
+                ('library_name', models.CharField(max_length=127)),
+                ('library_version', models.CharField(max_length=31)),
+                ('num', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Daily event count',
+                'verbose_name_plural': 'Daily event counts',
+                'db_table': 'h5p_events_daily',
+                'ordering': ['day', 'type', 'sub_type'],
+                'unique_together': {('day', 'type', 'sub_type', 'library_name', 'library_version')},
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 3.2.25 on 2026-10-19 19:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('h5pp', '0004_events_retention'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='h5p_content_user_data',
+            index=models.Index(fields=['content_main_id', 'delete_on_content_change'], name='h5p_user_data_reset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='h5p_contents',
+            index=models.Index(fields=['slug'], name='h5p_content_slug_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='h5p_contents_libraries',
+            index=models.Index(fields=['content_id', 'dependency_type', 'weight'], name='h5p_content_deps_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='h5p_libraries',
+            index=models.Index(fields=['machine_name', 'major_version', 'minor_version'], name='h5p_library_version_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 3.2.25 on 2026-10-19 19:24
+
+from django.db import migrations, models
+from django.utils.text import slugify
+
+
+def dedupe_slugs(apps, schema_editor):
+    # Give every content an unique slug before the constraint is added,
+    # numbering duplicates the same way new contents are numbered
+    h5p_contents = apps.get_model('h5pp', 'h5p_contents')
+    used = set()
+    for content in h5p_contents.objects.order_by('content_id').only('content_id', 'title', 'slug'):
+        slug = content.slug or slugify(content.title)[:120].strip('-') or 'h5p-content'
+        base, suffix = slug[:120], 1
+        while slug in used:
+            suffix += 1
+            slug = '%s-%s' % (base, suffix)
+        used.add(slug)
+        if slug != content.slug:
+            h5p_contents.objects.filter(content_id=content.content_id).update(slug=slug)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('h5pp', '0005_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_slugs, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='h5p_contents',
+            name='h5p_content_slug_idx',
+        ),
+        migrations.AlterField(
+            model_name='h5p_contents',
+            name='slug',
+            field=models.CharField(help_text='Human readable content identifier that is unique', max_length=127, unique=True),
+        ),
+    ]
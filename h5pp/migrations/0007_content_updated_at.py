@@ -0,0 +1,25 @@
+# Generated by Django 3.2.25 on 2026-10-19 19:33
+
+import time
+
+from django.db import migrations, models
+
+
+def stamp_contents(apps, schema_editor):
+    apps.get_model('h5pp', 'h5p_contents').objects.update(updated_at=int(time.time()))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('h5pp', '0006_unique_content_slug'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='h5p_contents',
+            name='updated_at',
+            field=models.PositiveIntegerField(default=0, help_text='Timestamp. Last change of the content or of its libraries'),
+        ),
+        migrations.RunPython(stamp_contents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 3.2.25 on 2026-10-19 19:56
+
+from django.db import migrations
+import h5pp.fields
+
+
+def compress_contents(apps, schema_editor):
+    if h5pp.fields.CompressedTextField.compressing():
+        h5pp.fields.store_compressed_fields(apps.get_model('h5pp', 'h5p_contents'), True)
+
+
+def decompress_contents(apps, schema_editor):
+    h5pp.fields.store_compressed_fields(apps.get_model('h5pp', 'h5p_contents'), False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('h5pp', '0007_content_updated_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='h5p_contents',
+            name='filtered',
+            field=h5pp.fields.CompressedTextField(help_text='Filtered version of json_contents'),
+        ),
+        migrations.AlterField(
+            model_name='h5p_contents',
+            name='json_contents',
+            field=h5pp.fields.CompressedTextField(help_text='The content in JSON format'),
+        ),
+        migrations.RunPython(compress_contents, decompress_contents),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 3.2.25 on 2026-10-19 20:00
+
+import ast
+import json
+
+from django.db import migrations, models
+
+FILES = ('preloaded_js', 'preloaded_css')
+
+
+##
+# Files of a column stored as the str() of a Python list, "[u'scripts/a.js', u'scripts/b.js']",
+# or as a comma separated list
+##
+def parse_files(value):
+    if not value:
+        return list()
+    try:
+        files = json.loads(value)
+    except ValueError:
+        try:
+            files = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            files = [f.strip(' u\'"') for f in value.strip('[]').split(',')]
+    if isinstance(files, str):
+        files = [files]
+    return [f for f in files if f]
+
+
+def files_to_json(apps, schema_editor):
+    libraries = apps.get_model('h5pp', 'h5p_libraries')
+    for library in libraries.objects.values('library_id', *FILES):
+        libraries.objects.filter(library_id=library['library_id']).update(
+            **dict((name, json.dumps(parse_files(library[name]))) for name in FILES))
+
+
+def files_to_text(apps, schema_editor):
+    libraries = apps.get_model('h5pp', 'h5p_libraries')
+    for library in libraries.objects.values('library_id', *FILES):
+        libraries.objects.filter(library_id=library['library_id']).update(
+            **dict((name, str(json.loads(library[name])) if library[name] else '') for name in FILES))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('h5pp', '0008_compressed_contents'),
+    ]
+
+    operations = [
+        # The columns are still text when the rows are converted
+        migrations.RunPython(files_to_json, files_to_text),
+        migrations.AlterField(
+            model_name='h5p_libraries',
+            name='preloaded_css',
+            field=models.JSONField(blank=True, default=list, help_text='List of Stylesheet files needed by the library', null=True),
+        ),
+        migrations.AlterField(
+            model_name='h5p_libraries',
+            name='preloaded_js',
+            field=models.JSONField(blank=True, default=list, help_text='List of JavaScript files needed by the library', null=True),
+        ),
+    ]
@@ -4,6 +4,8 @@ from django.db import models
 
 from datetime import datetime
 
+from h5pp.fields import CompressedTextField
+
 
 # Stores information about what h5p uses what libraries
 
@@ -18,6 +20,10 @@ class h5p_contents_libraries(models.Model):
     class Meta:
         db_table = 'h5p_contents_libraries'
         unique_together = ('content_id', 'library_id', 'dependency_type')
+        indexes = [
+            # loadContentDependencies: WHERE content_id = ? AND dependency_type = ? ORDER BY weight
+            models.Index(fields=['content_id', 'dependency_type', 'weight'], name='h5p_content_deps_idx'),
+        ]
 
 
 # Stores information about libraries
@@ -34,8 +40,10 @@ class h5p_libraries(models.Model):
                                                 help_text='If the library can be started alone (not a dependency) ?')
     fullscreen = models.PositiveSmallIntegerField(null=False, default=0, help_text='Display fullscreen button')
     embed_types = models.CharField(null=False, blank=True, default='', max_length=255)
-    preloaded_js = models.TextField(null=True, help_text='List of JavaScript files needed by the library')
-    preloaded_css = models.TextField(null=True, help_text='List of Stylesheet files needed by the library')
+    preloaded_js = models.JSONField(null=True, blank=True, default=list,
+                                    help_text='List of JavaScript files needed by the library')
+    preloaded_css = models.JSONField(null=True, blank=True, default=list,
+                                     help_text='List of Stylesheet files needed by the library')
     drop_library_css = models.TextField(null=True, blank=True,
                                         help_text='List of Libraries that should not have CSS included if this library is used')
     semantics = models.TextField(null=False, blank=True, help_text='The semantics definition in JSON format')
@@ -49,6 +57,10 @@ class h5p_libraries(models.Model):
         ordering = ['machine_name', 'major_version', 'minor_version']
         verbose_name = 'Library'
         verbose_name_plural = 'Libraries'
+        indexes = [
+            # Libraries are looked up by name and version nearly everywhere
+            models.Index(fields=['machine_name', 'major_version', 'minor_version'], name='h5p_library_version_idx'),
+        ]
 
     def __unicode__(self):
         return self.machine_name
@@ -98,7 +110,7 @@ class h5p_libraries_languages(models.Model):
 class h5p_contents(models.Model):
     content_id = models.AutoField(primary_key=True, help_text='Identifier of the content')
     title = models.CharField(null=False, max_length=255)
-    json_contents = models.TextField(null=False, help_text='The content in JSON format')
+    json_contents = CompressedTextField(null=False, help_text='The content in JSON format')
     embed_type = models.CharField(null=False, default='', max_length=127)
     disable = models.PositiveIntegerField(null=False, default=0)
     main_library_id = models.PositiveIntegerField(null=False,
@@ -108,8 +120,11 @@ class h5p_contents(models.Model):
     license = models.CharField(null=True, blank=True, max_length=7)
     meta_keywords = models.TextField(null=True, blank=True)
     meta_description = models.TextField(null=True, blank=True)
-    filtered = models.TextField(null=False, help_text='Filtered version of json_contents')
-    slug = models.CharField(null=False, max_length=127, help_text='Human readable content identifier that is unique')
+    filtered = CompressedTextField(null=False, help_text='Filtered version of json_contents')
+    slug = models.CharField(null=False, unique=True, max_length=127,
+                            help_text='Human readable content identifier that is unique')
+    updated_at = models.PositiveIntegerField(null=False, default=0,
+                                             help_text='Timestamp. Last change of the content or of its libraries')
 
     class Meta:
         db_table = 'h5p_contents'
@@ -183,6 +198,10 @@ class h5p_content_user_data(models.Model):
     class Meta:
         db_table = 'h5p_content_user_data'
         unique_together = ('user_id', 'content_main_id', 'sub_content_id', 'data_id')
+        indexes = [
+            # resetContentUserData: WHERE content_main_id = ? AND delete_on_content_change = 1
+            models.Index(fields=['content_main_id', 'delete_on_content_change'], name='h5p_user_data_reset_idx'),
+        ]
 
 
 # Keeps track of what happens in the H5p system
@@ -190,7 +209,7 @@ class h5p_content_user_data(models.Model):
 
 class h5p_events(models.Model):
     user_id = models.PositiveIntegerField(null=False, help_text='Identifier of the user who caused this event')
-    created_at = models.IntegerField(null=False)
+    created_at = models.IntegerField(null=False, db_index=True)
     type = models.CharField(null=False, max_length=63,
                             help_text='Type of the event. If it concerns a library, a content or a user')
     sub_type = models.CharField(null=False, max_length=63,
@@ -211,6 +230,25 @@ class h5p_events(models.Model):
         verbose_name_plural = 'Events'
 
 
+# Daily event counts kept after the events themselves are pruned
+
+
+class h5p_events_daily(models.Model):
+    day = models.DateField(null=False, help_text='Day (UTC) the events were created')
+    type = models.CharField(null=False, max_length=63)
+    sub_type = models.CharField(null=False, max_length=63)
+    library_name = models.CharField(null=False, max_length=127)
+    library_version = models.CharField(null=False, max_length=31)
+    num = models.PositiveIntegerField(null=False, default=0)
+
+    class Meta:
+        db_table = 'h5p_events_daily'
+        ordering = ['day', 'type', 'sub_type']
+        verbose_name = 'Daily event count'
+        verbose_name_plural = 'Daily event counts'
+        unique_together = ('day', 'type', 'sub_type', 'library_name', 'library_version')
+
+
 # Global counters for the H5P system
 
 
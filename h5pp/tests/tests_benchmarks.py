@@ -0,0 +1,81 @@
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase
+from h5pp.models import h5p_contents, h5p_libraries
+from io import StringIO
+import json
+import os
+import shutil
+import tempfile
+
+##
+# Tests for the benchmark suites and their JSON reports
+##
+
+
+class BenchmarkTestCase(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        print('setUp of BenchmarkTestCase ---- Ready')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_render_suite(self):
+        output = os.path.join(self.directory, 'render.json')
+        out = StringIO()
+        call_command('h5p_benchmark', 'render', '--repeat', '1', '--libraries', '3', '--depth', '5', '--size', '2',
+                     '--output', output, stdout=out)
+
+        with open(output) as f:
+            report = json.load(f)
+        self.assertEqual('render', report['suite'])
+        self.assertEqual({'libraries': 3, 'depth': 2, 'size': 2}, report['params'])
+        self.assertEqual(['h5p_load+include_h5p', 'h5p_embed', 'filter_parameters cold', 'filter_parameters warm',
+                          'get_dependencies_files'], [result['name'] for result in report['results']])
+        for result in report['results']:
+            self.assertTrue(result['min'] <= result['median'] <= result['max'])
+            self.assertTrue(result['peak'] > 0)
+        self.assertTrue(report['results'][2]['queries'] > 0)
+        self.assertEqual(0, report['results'][3]['queries'])
+        self.assertIn('5 results written', out.getvalue())
+
+        # The synthetic data is rolled back
+        self.assertFalse(h5p_libraries.objects.exists())
+        self.assertFalse(h5p_contents.objects.exists())
+        print('test_render_suite ---- Check')
+
+    def test_package_suite(self):
+        output = os.path.join(self.directory, 'package.json')
+        call_command('h5p_benchmark', 'package', '--repeat', '1', '--libraries', '2', '--files', '2',
+                     '--media-size', '1024', '--output', output, stdout=StringIO())
+
+        with open(output) as f:
+            report = json.load(f)
+        self.assertEqual({'libraries': 2, 'files': 2, 'media_size': 1024}, report['params'])
+        self.assertEqual(['is_valid_package', 'save_package', 'create_export_file', 'clone_content'],
+                         [result['name'] for result in report['results']])
+        self.assertTrue(report['results'][1]['queries'] > 0)
+
+        # The packages were installed, then removed with the synthetic data
+        self.assertFalse(h5p_libraries.objects.exists())
+        libraries = os.path.join(str(settings.H5P_STORAGE_ROOT), 'libraries')
+        self.assertFalse([name for name in os.listdir(libraries) if name.startswith('H5P.PackageBenchmark')])
+        print('test_package_suite ---- Check')
+
+    def test_storage_suite(self):
+        output = os.path.join(self.directory, 'storage.json')
+        call_command('h5p_benchmark', 'storage', '--repeat', '1', '--contents', '2', '--depth', '1', '--size', '20',
+                     '--output', output, stdout=StringIO())
+
+        with open(output) as f:
+            report = json.load(f)
+        self.assertEqual({'contents': 2, 'depth': 1, 'size': 20}, report['params'])
+        results = dict((result['name'], result) for result in report['results'])
+        self.assertEqual(['write plain', 'read plain', 'loadContent plain', 'write compressed', 'read compressed',
+                          'loadContent compressed'], [result['name'] for result in report['results']])
+        self.assertTrue(results['read compressed']['row_size'] < results['read plain']['row_size'])
+        self.assertEqual(1, results['read plain']['queries'])
+        self.assertFalse(h5p_contents.objects.exists())
+        print('test_storage_suite ---- Check')
@@ -0,0 +1,76 @@
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from h5pp.fields import COMPRESSED_PREFIX
+from h5pp.h5p.h5pclasses import H5PDjango
+from h5pp.models import h5p_contents, h5p_libraries
+from io import StringIO
+import json
+
+##
+# Tests for the compressed storage of the contents parameters
+##
+
+
+class CompressedFieldsTestCase(TestCase):
+
+    def setUp(self):
+        h5p_libraries.objects.create(library_id=1, machine_name='H5P.Test', title='Test', major_version=1,
+                                     minor_version=1, patch_version=2, runnable=1, preloaded_js=[], preloaded_css=[],
+                                     semantics='')
+        self.params = json.dumps({'text': ['<p>Some text of the content %s</p>' % i for i in range(100)]})
+        print('setUp of CompressedFieldsTestCase ---- Ready')
+
+    def create(self, content_id, params):
+        return h5p_contents.objects.create(content_id=content_id, title='ContentTest', json_contents=params,
+                                           main_library_id=1, filtered=params, slug='contenttest-%s' % content_id)
+
+    def stored(self, content_id):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT json_contents, filtered FROM h5p_contents WHERE content_id = %s', [content_id])
+            return cursor.fetchone()
+
+    def test_compressed_values(self):
+        self.create(1, self.params)
+        with self.settings(H5P_COMPRESS_CONTENTS=True):
+            self.create(2, self.params)
+            self.create(3, '{}')
+
+        self.assertEqual((self.params, self.params), self.stored(1))
+        params, filtered = self.stored(2)
+        self.assertTrue(params.startswith(COMPRESSED_PREFIX))
+        self.assertTrue(len(params) < len(self.params) / 2)
+        self.assertEqual(('{}', '{}'), self.stored(3))
+
+        # Plain and compressed values are read the same, whatever the setting
+        for content_id in [1, 2]:
+            self.assertEqual(self.params, h5p_contents.objects.get(content_id=content_id).json_contents)
+            self.assertEqual([(self.params, self.params)], list(h5p_contents.objects.filter(
+                content_id=content_id).values_list('json_contents', 'filtered')))
+        interface = H5PDjango(User.objects.create(username='titi'))
+        content = interface.loadContent(2)
+        self.assertEqual((self.params, self.params), (content['params'], content['filtered']))
+        self.assertEqual(self.params, interface.loadContentParams(2))
+
+        with self.settings(H5P_COMPRESS_CONTENTS=True):
+            h5p_contents.objects.filter(content_id=2).update(filtered='')
+            self.assertEqual(2, h5p_contents.objects.filter(filtered='').get().content_id)
+        print('test_compressed_values ---- Check')
+
+    def test_command(self):
+        self.create(1, self.params)
+        self.create(2, '{}')
+
+        out = StringIO()
+        call_command('h5p_compress_contents', '--batch-size', '1', stdout=out)
+        self.assertIn('2 contents written.', out.getvalue())
+        self.assertTrue(self.stored(1)[1].startswith(COMPRESSED_PREFIX))
+        self.assertEqual(('{}', '{}'), self.stored(2))
+        self.assertEqual(self.params, h5p_contents.objects.get(content_id=1).filtered)
+
+        out = StringIO()
+        call_command('h5p_compress_contents', '--decompress', stdout=out)
+        self.assertIn('1 contents decompressed.', out.getvalue())
+        self.assertEqual((self.params, self.params), self.stored(1))
+        print('test_command ---- Check')
@@ -0,0 +1,150 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TransactionTestCase
+from h5pp.benchmarks.package import PackageBenchmark
+from h5pp.forms import handleUploadedFile
+from h5pp.h5p.h5pclasses import H5PDjango
+from h5pp.models import h5p_contents, h5p_libraries, h5p_libraries_libraries
+from pathlib import Path
+import json
+import shutil
+import tempfile
+import threading
+import urllib.parse
+
+##
+# Stress tests running package uploads and editor library loads in parallel threads,
+# as a threaded or ASGI server does
+##
+
+
+class ConcurrencyTestCase(TransactionTestCase):
+    threads = 4
+
+    def setUp(self):
+        self.root = Path(settings.H5P_STORAGE_ROOT)
+        self.user = User.objects.create(username='titi')
+        self.created = list()
+        print('setUp of ConcurrencyTestCase ---- Ready')
+
+    def tearDown(self):
+        for path in set(self.created):
+            if path.is_dir():
+                shutil.rmtree(str(path), ignore_errors=True)
+            elif path.exists():
+                path.unlink()
+
+    ##
+    # Call target(index) in count threads started together, raising the first error
+    ##
+    def run_threads(self, target, count):
+        errors = list()
+        barrier = threading.Barrier(count, timeout=60)
+
+        def run(index):
+            try:
+                target(index, barrier)
+            except Exception as e:
+                errors.append(e)
+                barrier.abort()
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=run, args=(index,)) for index in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if errors:
+            raise errors[0]
+
+    def test_parallel_uploads(self):
+        benchmark = PackageBenchmark(libraries=2, files=1, media_size=64)
+        benchmark.root = self.root
+        # Library names not used by the benchmark tests
+        benchmark.packages = 100
+        directory = Path(tempfile.mkdtemp())
+        self.created.append(directory)
+        packages = list()
+        for index in range(self.threads):
+            benchmark.build_package(directory / ('%s.h5p' % index))
+            packages.append((directory / ('%s.h5p' % index)).read_bytes())
+        self.created.extend(benchmark.created)
+
+        results = dict()
+        lock = threading.Lock()
+
+        def upload(index, barrier):
+            # Every upload has the same file name
+            paths = handleUploadedFile(SimpleUploadedFile('upload.h5p', packages[index]), 'upload.h5p')
+            interface = H5PDjango(self.user)
+            validator = interface.h5pGetInstance('validator', paths['folderPath'], paths['path'])
+            # All the uploads are set up before any of them is validated
+            barrier.wait()
+            valid = validator.is_valid_package(False, False)
+            # The sqlite test database does not take concurrent writes
+            with lock:
+                storage = interface.h5pGetInstance('storage')
+                storage.save_package(None, None, False, {'disable': 0, 'title': 'Upload %s' % index})
+            results[index] = (valid, paths['folderPath'], storage.contentId)
+
+        self.run_threads(upload, self.threads)
+
+        self.assertEqual(self.threads, h5p_contents.objects.count())
+        for index, (valid, folder, contentId) in results.items():
+            self.created.append(self.root / 'content' / str(contentId))
+            self.assertTrue(valid)
+            self.assertFalse(folder.exists())
+            content = h5p_contents.objects.get(content_id=contentId)
+            self.assertEqual('Upload %s' % index, content.title)
+            self.assertEqual('H5P.PackageBenchmark%sx0' % (101 + index),
+                             h5p_libraries.objects.get(library_id=content.main_library_id).machine_name)
+            self.assertTrue((self.root / 'content' / str(contentId) / 'images' / 'file-0.png').exists())
+        print('test_parallel_uploads ---- Check')
+
+    def test_parallel_library_data(self):
+        for index in range(self.threads):
+            editor = h5p_libraries.objects.create(
+                machine_name='H5PEditor.Concurrency%s' % index,
+                title='Concurrency editor %s' % index,
+                major_version=1,
+                minor_version=0,
+                patch_version=0,
+                runnable=0,
+                preloaded_js=[],
+                preloaded_css=['styles/editor.css'],
+                semantics='',
+            )
+            library = h5p_libraries.objects.create(
+                machine_name='H5P.Concurrency%s' % index,
+                title='Concurrency %s' % index,
+                major_version=1,
+                minor_version=0,
+                patch_version=0,
+                runnable=1,
+                preloaded_js=[],
+                preloaded_css=[],
+                semantics='[]',
+            )
+            h5p_libraries_libraries.objects.create(library_id=library.library_id,
+                                                   required_library_id=editor.library_id, dependency_type='editor')
+            folder = self.root / 'libraries' / ('H5PEditor.Concurrency%s-1.0' % index)
+            self.created.append(folder)
+            (folder / 'styles').mkdir(parents=True, exist_ok=True)
+            (folder / 'styles' / 'editor.css').write_text('@font-face { src: url(font.woff); }\n' * 100)
+
+        url = urllib.parse.urljoin(settings.MEDIA_URL, 'h5pp/')
+
+        def load(index, barrier):
+            editor = H5PDjango(self.user).h5pGetInstance('editor')
+            expected = 'url(%slibraries/H5PEditor.Concurrency%s-1.0/fonts/font.woff)' % (url, index)
+            barrier.wait()
+            for _ in range(20):
+                data = json.loads(editor.getLibraryData('H5P.Concurrency%s' % index, 1, 0, 'en'))
+                css = ''.join(data['css'].values())
+                self.assertEqual(100, css.count(expected))
+
+        self.run_threads(load, self.threads)
+        print('test_parallel_library_data ---- Check')
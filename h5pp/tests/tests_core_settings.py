@@ -0,0 +1,91 @@
+from django.contrib.auth.models import AnonymousUser, User
+from django.test import TestCase, RequestFactory
+from h5pp.h5p.h5pmodule import h5p_get_core_settings, h5p_encode_core_settings, create_token, valid_token, \
+    get_time_factor
+from h5pp.models import h5p_points
+from h5pp.views import ajax
+import json
+
+##
+# Tests for the H5PIntegration core settings
+##
+
+
+class CoreSettingsTestCase(TestCase):
+
+    def setUp(self):
+        User.objects.create(username='titi', email='titi@example.com')
+        print('setUp of CoreSettingsTestCase ---- Ready')
+
+    def test_encoded_settings(self):
+        user = User.objects.get(username='titi')
+        contents = {'contents': {'cid-1': {'title': 'ContentTest "quoted"'}}, 'loadedJs': ['/a.js']}
+
+        encoded = json.loads(h5p_encode_core_settings(user, contents))
+        expected = h5p_get_core_settings(user)
+        expected.update(contents)
+
+        self.assertEqual(expected, encoded)
+        self.assertEqual(create_token('result', user), encoded['tokens']['result'])
+        self.assertEqual({'name': 'titi', 'mail': 'titi@example.com'}, encoded['user'])
+        print('test_encoded_settings ---- Check')
+
+    def test_static_settings_are_built_once(self):
+        h5p_get_core_settings(AnonymousUser())
+        with self.assertNumQueries(0):
+            core = h5p_get_core_settings(AnonymousUser())
+            h5p_encode_core_settings(AnonymousUser(), dict())
+
+        self.assertFalse(core['postUserStatistics'])
+        self.assertFalse('user' in core)
+
+        # The returned settings are copies
+        core['l10n']['H5P']['close'] = 'Changed'
+        self.assertEqual('Close', h5p_get_core_settings(AnonymousUser())['l10n']['H5P']['close'])
+        print('test_static_settings_are_built_once ---- Check')
+
+
+class TokenTestCase(TestCase):
+
+    def setUp(self):
+        titi = User.objects.create(username='titi')
+        User.objects.create(username='toto')
+        h5p_points.objects.create(content_id=1, uid=titi.id, started=1)
+        print('setUp of TokenTestCase ---- Ready')
+
+    def test_tokens_are_stable(self):
+        titi = User.objects.get(username='titi')
+        toto = User.objects.get(username='toto')
+
+        self.assertEqual(create_token('result', titi), create_token('result', titi))
+        self.assertNotEqual(create_token('result', titi), create_token('result', toto))
+        self.assertNotEqual(create_token('result', titi), create_token('contentuserdata', titi))
+        self.assertEqual(h5p_get_core_settings(titi)['ajax'], h5p_get_core_settings(titi)['ajax'])
+        print('test_tokens_are_stable ---- Check')
+
+    def test_valid_token(self):
+        titi = User.objects.get(username='titi')
+        toto = User.objects.get(username='toto')
+
+        self.assertTrue(valid_token('result', create_token('result', titi), titi))
+        self.assertTrue(valid_token('result', create_token('result', titi, get_time_factor() - 1), titi))
+        self.assertFalse(valid_token('result', create_token('result', titi, get_time_factor() - 2), titi))
+        self.assertFalse(valid_token('result', create_token('result', titi), toto))
+        self.assertFalse(valid_token('result', None, titi))
+        print('test_valid_token ---- Check')
+
+    def test_ajax_checks_token(self):
+        titi = User.objects.get(username='titi')
+        data = {'contentId': '1', 'score': '3', 'maxScore': '5'}
+
+        request = RequestFactory().post('/h5p/ajax/?setFinished&token=invalid', data)
+        request.user = titi
+        self.assertEqual(403, ajax(request).status_code)
+        self.assertEqual(None, h5p_points.objects.get(content_id=1, uid=titi.id).points)
+
+        request = RequestFactory().post(h5p_get_core_settings(titi)['ajax']['setFinished'], data)
+        request.user = titi
+        response = ajax(request)
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(3, h5p_points.objects.get(content_id=1, uid=titi.id).points)
+        print('test_ajax_checks_token ---- Check')
@@ -0,0 +1,100 @@
+from django.core.checks import Tags, run_checks
+from django.test import TestCase, RequestFactory
+from h5pp.checks import check_libraries_cache
+from h5pp.h5p.editor.h5peditorclasses import H5PDjangoEditor
+from h5pp.views import libraryDataResponse
+import gzip
+import shutil
+import tempfile
+
+##
+# Tests for the editor library data cache
+##
+
+
+class LibraryDataCacheTestCase(TestCase):
+
+    def setUp(self):
+        self.filesDir = tempfile.mkdtemp()
+        self.builds = list()
+        H5PDjangoEditor.clearLibraryDataCache(self.filesDir)
+        print('setUp of LibraryDataCacheTestCase ---- Ready')
+
+    def tearDown(self):
+        H5PDjangoEditor.clearLibraryDataCache(self.filesDir)
+        shutil.rmtree(self.filesDir, ignore_errors=True)
+
+    def getEditor(self):
+        editor = H5PDjangoEditor(None, None, self.filesDir, self.filesDir)
+
+        def getLibraryData(machineName, majorVersion, minorVersion, langageCode, prefix=''):
+            self.builds.append((machineName, langageCode))
+            return '{"semantics": "%s", "language": "%s"}' % (machineName, langageCode)
+
+        editor.getLibraryData = getLibraryData
+        return editor
+
+    def test_payload_is_built_once(self):
+        first = self.getEditor().getCachedLibraryData('H5P.Test', 1, 1, 'en')
+        second = self.getEditor().getCachedLibraryData('H5P.Test', 1, 1, 'en')
+
+        self.assertEqual(1, len(self.builds))
+        self.assertEqual(first['etag'], second['etag'])
+        self.assertEqual(first['data'], gzip.decompress(second['gzip']))
+
+        self.getEditor().getCachedLibraryData('H5P.Test', 1, 1, 'fr')
+        self.assertEqual(2, len(self.builds))
+        print('test_payload_is_built_once ---- Check')
+
+    def test_disk_cache_is_shared(self):
+        self.getEditor().getCachedLibraryData('H5P.Test', 1, 1, 'en')
+
+        # A new process starts with an empty memory cache
+        H5PDjangoEditor._libraryDataCache.clear()
+        self.getEditor().getCachedLibraryData('H5P.Test', 1, 1, 'en')
+        self.assertEqual(1, len(self.builds))
+
+        H5PDjangoEditor.clearLibraryDataCache(self.filesDir)
+        self.getEditor().getCachedLibraryData('H5P.Test', 1, 1, 'en')
+        self.assertEqual(2, len(self.builds))
+        print('test_disk_cache_is_shared ---- Check')
+
+    def test_conditional_response(self):
+        data = self.getEditor().getCachedLibraryData('H5P.Test', 1, 1, 'en')
+        factory = RequestFactory()
+
+        gzipped = libraryDataResponse(factory.get('/', HTTP_ACCEPT_ENCODING='gzip, deflate'), data)
+        self.assertEqual(200, gzipped.status_code)
+        self.assertEqual('gzip', gzipped['Content-Encoding'])
+        self.assertEqual(data['gzip'], gzipped.content)
+        self.assertEqual('"%s-gzip"' % data['etag'], gzipped['ETag'])
+
+        request = factory.get('/', HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=gzipped['ETag'])
+        response = libraryDataResponse(request, data)
+        self.assertEqual(304, response.status_code)
+
+        # The etag of the gzipped payload doesn't validate the identity one
+        response = libraryDataResponse(factory.get('/', HTTP_IF_NONE_MATCH=gzipped['ETag']), data)
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(data['data'], response.content)
+        self.assertEqual('"%s"' % data['etag'], response['ETag'])
+
+        response = libraryDataResponse(factory.get('/', HTTP_IF_NONE_MATCH=response['ETag']), data)
+        self.assertEqual(304, response.status_code)
+        print('test_conditional_response ---- Check')
+
+
+class LibrariesCacheCheckTestCase(TestCase):
+
+    def test_shared_cache(self):
+        caches = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+                  'shared': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'h5p_cache'}}
+        with self.settings(CACHES=caches):
+            self.assertEqual(['h5pp.W001'], [error.id for error in check_libraries_cache(None)])
+            with self.settings(H5P_CACHE='shared'):
+                self.assertEqual([], check_libraries_cache(None))
+            with self.settings(H5P_CACHE='missing'):
+                self.assertEqual(['h5pp.E001'], [error.id for error in check_libraries_cache(None)])
+
+        self.assertIn('h5pp.W001', [error.id for error in run_checks(tags=[Tags.caches])])
+        print('test_shared_cache ---- Check')
@@ -0,0 +1,108 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from h5pp.h5p.h5pclasses import H5PDjango
+from h5pp.h5p.editor.h5peditorclasses import H5PDjangoEditor
+from h5pp.h5p.editor.library.h5peditorstorage import H5PEditorStorage
+from h5pp.models import h5p_libraries
+from unittest import mock
+import json
+import os
+import shutil
+import tempfile
+
+##
+# Tests for the processing of the content files referenced by the editor parameters
+##
+
+SEMANTICS = [
+    {'name': 'image', 'type': 'image'},
+    {'name': 'gallery', 'type': 'list', 'field': {'name': 'item', 'type': 'image'}},
+    {'name': 'sounds', 'type': 'audio'},
+]
+
+
+class ProcessParametersTestCase(TestCase):
+
+    def setUp(self):
+        h5p_libraries.objects.create(
+            library_id=1,
+            machine_name='H5P.Test',
+            title='Test',
+            major_version=1,
+            minor_version=1,
+            patch_version=2,
+            runnable=1,
+            fullscreen=0,
+            embed_types='',
+            preloaded_js=[],
+            preloaded_css=[],
+            drop_library_css=None,
+            semantics=json.dumps(SEMANTICS),
+            restricted=0,
+            tutorial_url=''
+        )
+        self.filesDir = tempfile.mkdtemp()
+        core = H5PDjango(User.objects.create(username='titi')).h5pGetInstance('core')
+        self.editor = H5PDjangoEditor(core, H5PEditorStorage(), self.filesDir, self.filesDir)
+        os.makedirs(os.path.join(self.filesDir, 'content'))
+        self.editor.createDirectories(1)
+        for name in ['a.png', 'b.png', 'c.png', 'd.mp3']:
+            self.upload('images/' + name)
+        self.library = {'machineName': 'H5P.Test', 'majorVersion': 1, 'minorVersion': 1}
+        print('setUp of ProcessParametersTestCase ---- Ready')
+
+    def tearDown(self):
+        shutil.rmtree(self.filesDir, ignore_errors=True)
+
+    def upload(self, path):
+        path = os.path.join(self.filesDir, 'editor', path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(path)
+
+    def contentFile(self, path):
+        return os.path.join(self.filesDir, 'content', '1', path)
+
+    def test_first_save_copies_files(self):
+        params = {'image': {'path': 'images/a.png'}, 'gallery': [{'path': 'images/b.png'}],
+                  'sounds': [{'path': 'images/d.mp3'}]}
+        changes = self.editor.processParameters(1, self.library, params)
+
+        self.assertEqual(['images/a.png', 'images/b.png', 'images/d.mp3'], changes['added'])
+        self.assertTrue(os.path.isfile(self.contentFile('images/b.png')))
+        self.assertTrue(os.path.isfile(self.contentFile('images/d.mp3')))
+        # The editor uploads are moved, not duplicated
+        self.assertFalse(os.path.exists(os.path.join(self.filesDir, 'editor', 'images', 'b.png')))
+        self.assertTrue(os.path.isfile(os.path.join(self.filesDir, 'editor', 'images', 'c.png')))
+        print('test_first_save_copies_files ---- Check')
+
+    def test_only_changed_files_are_touched(self):
+        old = {'image': {'path': 'images/a.png'}, 'gallery': [{'path': 'images/b.png'}]}
+        self.editor.processParameters(1, self.library, json.loads(json.dumps(old)))
+
+        new = {'image': {'path': 'images/a.png'}, 'gallery': [{'path': 'images/c.png'}]}
+        with mock.patch('os.path.exists', wraps=os.path.exists) as exists:
+            changes = self.editor.processParameters(1, self.library, new, self.library, old)
+
+        self.assertEqual(['images/c.png'], changes['added'])
+        self.assertEqual(['images/b.png'], changes['removed'])
+        self.assertEqual(['images/a.png'], changes['kept'])
+        self.assertFalse([call for call in exists.call_args_list if 'a.png' in str(call)])
+        self.assertTrue(os.path.isfile(self.contentFile('images/a.png')))
+        self.assertTrue(os.path.isfile(self.contentFile('images/c.png')))
+        self.assertFalse(os.path.exists(self.contentFile('images/b.png')))
+        print('test_only_changed_files_are_touched ---- Check')
+
+    def test_semantics_are_loaded_once(self):
+        params = {'image': {'path': 'images/a.png'}}
+        self.editor.processParameters(1, self.library, params)
+        with self.assertNumQueries(0):
+            self.editor.processParameters(1, self.library, params, self.library, params)
+        print('test_semantics_are_loaded_once ---- Check')
+
+    def test_foreign_files_are_not_removed(self):
+        old = {'image': {'path': 'http://example.com/a.png'}, 'gallery': [{'path': '../../../../etc/passwd'}]}
+        changes = self.editor.processParameters(1, self.library, {}, self.library, old)
+
+        self.assertEqual([], changes['removed'])
+        print('test_foreign_files_are_not_removed ---- Check')
@@ -0,0 +1,171 @@
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.signals import request_finished
+from django.db import DatabaseError
+from h5pp.h5p.h5pevent import H5PEvent
+from h5pp.models import h5p_events, h5p_events_daily, h5p_counters
+from unittest import mock
+import time
+
+##
+# Tests for the buffered event log
+##
+
+
+class H5PEventTestCase(TestCase):
+
+    def setUp(self):
+        User.objects.create(
+            username='titi'
+        )
+        H5PEvent.flush()
+        print('setUp of H5PEventTestCase ---- Ready')
+
+    def test_events_are_buffered(self):
+        user = User.objects.get(username='titi')
+        H5PEvent(user, 'content', 'create', 1, 'ContentTest', 'H5P.Test', '1.1')
+
+        self.assertEqual(0, h5p_events.objects.count())
+        self.assertTrue(H5PEvent.pending() > 0)
+
+        H5PEvent.flush()
+
+        self.assertEqual(1, h5p_events.objects.count())
+        self.assertEqual(0, H5PEvent.pending())
+        print('test_events_are_buffered ---- Check')
+
+    def test_counters_are_aggregated(self):
+        user = User.objects.get(username='titi')
+        for i in range(0, 3):
+            H5PEvent(user, 'content', 'create', i, 'ContentTest', 'H5P.Test', '1.1')
+        H5PEvent.flush()
+
+        counter = h5p_counters.objects.get(type='content create', library_name='H5P.Test', library_version='1.1')
+        self.assertEqual(3, counter.num)
+
+        H5PEvent(user, 'content', 'create', 4, 'ContentTest', 'H5P.Test', '1.1')
+        with self.assertNumQueries(2):
+            H5PEvent.flush()
+
+        counter.refresh_from_db()
+        self.assertEqual(4, counter.num)
+        print('test_counters_are_aggregated ---- Check')
+
+    def test_failed_flush_keeps_the_buffers(self):
+        user = User.objects.get(username='titi')
+        H5PEvent(user, 'content', 'create', 1, 'ContentTest', 'H5P.Test', '1.1')
+        H5PEvent(user, 'library', 'create', None, None, 'H5P.Other', '1.0')
+
+        with mock.patch.object(h5p_events.objects, 'bulk_create', side_effect=DatabaseError):
+            self.assertRaises(DatabaseError, H5PEvent.flush)
+        self.assertEqual(4, H5PEvent.pending())
+
+        # The events are written, the second counter fails
+        increment_counter = H5PEvent.increment_counter
+        calls = list()
+
+        def failing_increment(*args, **kwargs):
+            calls.append(args)
+            if len(calls) == 2:
+                raise DatabaseError()
+            increment_counter(*args, **kwargs)
+
+        with mock.patch.object(H5PEvent, 'increment_counter', side_effect=failing_increment):
+            self.assertRaises(DatabaseError, H5PEvent.flush)
+        self.assertEqual(2, h5p_events.objects.count())
+        self.assertEqual(1, H5PEvent.pending())
+
+        H5PEvent.flush()
+        self.assertEqual(0, H5PEvent.pending())
+        self.assertEqual(2, h5p_events.objects.count())
+        self.assertEqual([1, 1], sorted(h5p_counters.objects.values_list('num', flat=True)))
+        print('test_failed_flush_keeps_the_buffers ---- Check')
+
+    def test_failed_flush_after_request(self):
+        user = User.objects.get(username='titi')
+        H5PEvent(user, 'content', 'create', 1, 'ContentTest', 'H5P.Test', '1.1')
+
+        # The response is already sent, the error is only logged
+        with mock.patch.object(h5p_events.objects, 'bulk_create', side_effect=DatabaseError):
+            with self.assertLogs('h5pp.h5p.h5pevent', 'ERROR'):
+                request_finished.send(sender=self.__class__)
+        self.assertEqual(2, H5PEvent.pending())
+
+        request_finished.send(sender=self.__class__)
+        self.assertEqual(1, h5p_events.objects.count())
+        self.assertEqual(0, H5PEvent.pending())
+        print('test_failed_flush_after_request ---- Check')
+
+    def test_buffer_max(self):
+        user = User.objects.get(username='titi')
+        with mock.patch.object(H5PEvent, 'buffer_max', 2), \
+                mock.patch.object(h5p_events.objects, 'bulk_create', side_effect=DatabaseError):
+            H5PEvent(user, 'content', 'create', 1, 'ContentTest', 'H5P.Buffer', '1.0')
+            H5PEvent(user, 'content', 'create', 2, 'ContentTest', 'H5P.Buffer', '1.0')
+            with self.assertLogs('h5pp.h5p.h5pevent', 'WARNING'):
+                H5PEvent(user, 'content', 'create', 3, 'ContentTest', 'H5P.Buffer', '1.0')
+            self.assertEqual([2, 3], [event.content_id for event in H5PEvent._events])
+
+            with self.assertLogs('h5pp.h5p.h5pevent', 'ERROR'):
+                H5PEvent.flush_or_log()
+            self.assertEqual(2, len(H5PEvent._events))
+
+        H5PEvent.flush()
+        events = h5p_events.objects.filter(library_name='H5P.Buffer')
+        self.assertEqual([2, 3], sorted(events.values_list('content_id', flat=True)))
+        self.assertEqual(3, h5p_counters.objects.get(library_name='H5P.Buffer').num)
+        print('test_buffer_max ---- Check')
+
+    def test_flush_at_exit(self):
+        user = User.objects.get(username='titi')
+        H5PEvent(user, 'content', 'create', 1, 'ContentTest', 'H5P.Test', '1.1')
+
+        # Buffered for another database
+        with mock.patch.object(H5PEvent, 'database', return_value='other'):
+            H5PEvent.flush_at_exit()
+        self.assertEqual(0, h5p_events.objects.count())
+
+        with mock.patch.object(h5p_events.objects, 'bulk_create', side_effect=DatabaseError):
+            with self.assertLogs('h5pp.h5p.h5pevent', 'ERROR'):
+                H5PEvent.flush_at_exit()
+        self.assertEqual(2, H5PEvent.pending())
+
+        H5PEvent.flush_at_exit()
+        self.assertEqual(1, h5p_events.objects.count())
+        self.assertEqual(0, H5PEvent.pending())
+        print('test_flush_at_exit ---- Check')
+
+    def test_log_level(self):
+        user = User.objects.get(username='titi')
+        log_level = H5PEvent.log_level
+        try:
+            H5PEvent.log_level = H5PEvent.LOG_NONE
+            H5PEvent(user, 'content', 'create', 1, 'ContentTest', 'H5P.Test', '1.1')
+            H5PEvent.flush()
+            self.assertEqual(0, h5p_events.objects.count())
+
+            H5PEvent.log_level = H5PEvent.LOG_ALL
+            H5PEvent(user, 'content', 'view', 1, 'ContentTest', 'H5P.Test', '1.1')
+            H5PEvent.flush()
+            self.assertEqual(1, h5p_events.objects.count())
+        finally:
+            H5PEvent.log_level = log_level
+        print('test_log_level ---- Check')
+
+    def test_prune(self):
+        old = (int(time.time()) - H5PEvent.log_time) // 86400 * 86400 - 43200
+        for i in range(0, 5):
+            h5p_events.objects.create(user_id=1, created_at=old + i, type='content', sub_type='create',
+                                      content_id=i, content_title='', library_name='H5P.Test', library_version='1.1')
+        h5p_events.objects.create(user_id=1, created_at=int(time.time()), type='content', sub_type='create',
+                                  content_id=6, content_title='', library_name='H5P.Test', library_version='1.1')
+
+        self.assertEqual(5, H5PEvent.prune(dry_run=True))
+        self.assertEqual(6, h5p_events.objects.count())
+
+        self.assertEqual(5, H5PEvent.prune(batch_size=2))
+        self.assertEqual(1, h5p_events.objects.count())
+
+        rollup = h5p_events_daily.objects.get(type='content', sub_type='create', library_name='H5P.Test')
+        self.assertEqual(5, rollup.num)
+        print('test_prune ---- Check')
@@ -0,0 +1,111 @@
+from django.contrib.auth.models import AnonymousUser, User
+from django.http import HttpResponse
+from django.test import TestCase, RequestFactory
+from h5pp.h5p.h5pclasses import H5PDjango
+from h5pp.h5p.h5pmodule import h5p_get_content_validators
+from h5pp.models import *
+from h5pp.views import ajax, conditionalResponse
+
+##
+# Tests for the HTTP caching validators of the content pages and ajax views
+##
+
+
+class HttpCacheTestCase(TestCase):
+
+    def setUp(self):
+        h5p_libraries.objects.create(
+            library_id=1,
+            machine_name='H5P.Test',
+            title='Test',
+            major_version=1,
+            minor_version=1,
+            patch_version=2,
+            runnable=1,
+            fullscreen=0,
+            embed_types='',
+            preloaded_js=[],
+            preloaded_css=[],
+            drop_library_css=None,
+            semantics='',
+            restricted=0,
+            tutorial_url=''
+        )
+        h5p_contents.objects.create(
+            content_id=1,
+            title='ContentTest',
+            json_contents='{}',
+            main_library_id=1,
+            filtered='',
+            slug='contenttest',
+            updated_at=1000
+        )
+        h5p_contents_libraries.objects.create(content_id=1, library_id=1)
+        self.user = User.objects.create(username='titi')
+        print('setUp of HttpCacheTestCase ---- Ready')
+
+    def test_content_validators(self):
+        validators = h5p_get_content_validators(1, AnonymousUser())
+        self.assertEqual(1000, validators['last_modified'])
+        self.assertEqual(validators, h5p_get_content_validators(1, AnonymousUser()))
+        self.assertEqual(None, h5p_get_content_validators(2, AnonymousUser()))
+
+        H5PDjango(self.user).updateContentFields(1, {'filtered': '{}'})
+        changed = h5p_get_content_validators(1, AnonymousUser())
+        self.assertNotEqual(validators['etag'], changed['etag'])
+        self.assertTrue(changed['last_modified'] > 1000)
+
+        h5p_libraries.objects.filter(library_id=1).update(patch_version=3)
+        self.assertNotEqual(changed['etag'], h5p_get_content_validators(1, AnonymousUser())['etag'])
+        print('test_content_validators ---- Check')
+
+    def test_user_validators(self):
+        validators = h5p_get_content_validators(1, self.user)
+        self.assertNotEqual(validators['etag'], h5p_get_content_validators(1, AnonymousUser())['etag'])
+
+        h5p_points.objects.create(content_id=1, uid=self.user.id, started=1500, finished=2000, points=3, max_points=5)
+        changed = h5p_get_content_validators(1, self.user)
+        self.assertNotEqual(validators['etag'], changed['etag'])
+        self.assertEqual(2000, changed['last_modified'])
+        print('test_user_validators ---- Check')
+
+    def test_library_upgrade(self):
+        validators = h5p_get_content_validators(1, AnonymousUser())
+        H5PDjango(self.user).clearFilteredParameters(1)
+        self.assertNotEqual(validators['etag'], h5p_get_content_validators(1, AnonymousUser())['etag'])
+        print('test_library_upgrade ---- Check')
+
+    def test_conditional_response(self):
+        validators = h5p_get_content_validators(1, AnonymousUser())
+        renders = list()
+
+        def renderResponse():
+            renders.append(1)
+            return HttpResponse('content')
+
+        request = RequestFactory().get('/h5p/content/1/')
+        request.user = AnonymousUser()
+        response = conditionalResponse(request, validators, renderResponse)
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(validators['etag'], response['ETag'])
+        self.assertIn('must-revalidate', response['Cache-Control'])
+
+        request = RequestFactory().get('/h5p/content/1/', HTTP_IF_NONE_MATCH=response['ETag'])
+        request.user = AnonymousUser()
+        self.assertEqual(304, conditionalResponse(request, validators, renderResponse).status_code)
+        self.assertEqual(1, len(renders))
+        print('test_conditional_response ---- Check')
+
+    def test_user_scores(self):
+        h5p_points.objects.create(content_id=1, uid=self.user.id, started=1500, finished=2000, points=3, max_points=5)
+
+        request = RequestFactory().get('/h5p/ajax/', {'user-scores': 1})
+        request.user = self.user
+        response = ajax(request)
+        self.assertEqual(200, response.status_code)
+        self.assertIn('private', response['Cache-Control'])
+
+        request = RequestFactory().get('/h5p/ajax/', {'user-scores': 1}, HTTP_IF_NONE_MATCH=response['ETag'])
+        request.user = self.user
+        self.assertEqual(304, ajax(request).status_code)
+        print('test_user_scores ---- Check')
@@ -23,8 +23,8 @@ class H5pModuleTestCase(TestCase):
             runnable=1,
             fullscreen=0,
             embed_types='',
-            preloaded_js="[u'scripts/test.js']",
-            preloaded_css="[u'styles/test.css']",
+            preloaded_js=['scripts/test.js'],
+            preloaded_css=['styles/test.css'],
             drop_library_css=None,
             semantics='',
             restricted=0,
@@ -102,8 +102,8 @@ class H5PClassesTestCase(TestCase):
             runnable=1,
             fullscreen=0,
             embed_types='',
-            preloaded_js="[u'scripts/test.js']",
-            preloaded_css="[u'styles/test.css']",
+            preloaded_js=['scripts/test.js'],
+            preloaded_css=['styles/test.css'],
             drop_library_css=None,
             semantics='',
             restricted=0,
@@ -189,8 +189,8 @@ class H5PClassesTestCase(TestCase):
             runnable=1,
             fullscreen=0,
             embed_types='',
-            preloaded_js="[u'scripts/test.js']",
-            preloaded_css="[u'styles/test.css']",
+            preloaded_js=['scripts/test.js'],
+            preloaded_css=['styles/test.css'],
             drop_library_css=None,
             semantics='',
             restricted=0,
@@ -253,8 +253,8 @@ class H5PClassesTestCase(TestCase):
             runnable=1,
             fullscreen=0,
             embed_types='',
-            preloaded_js="[u'scripts/test2.js']",
-            preloaded_css="[u'styles/test2.css']",
+            preloaded_js=['scripts/test2.js'],
+            preloaded_css=['styles/test2.css'],
             drop_library_css=None,
             semantics='',
             restricted=0,
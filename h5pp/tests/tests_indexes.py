@@ -0,0 +1,38 @@
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase
+from h5pp.models import h5p_libraries, h5p_contents, h5p_contents_libraries, h5p_content_user_data
+
+##
+# Check that the lookups performed by the h5p classes are served by an index
+##
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN output is checked for SQLite only')
+class IndexesTestCase(TestCase):
+
+    def assertUsesIndex(self, queryset, index):
+        plan = queryset.explain()
+        self.assertIn(index, plan, plan)
+
+    def test_library_version_lookup(self):
+        queryset = h5p_libraries.objects.filter(machine_name='H5P.Test', major_version=1, minor_version=1)
+        self.assertUsesIndex(queryset.values('library_id'), 'h5p_library_version_idx')
+        self.assertUsesIndex(queryset.values('semantics'), 'h5p_library_version_idx')
+        print('test_library_version_lookup ---- Check')
+
+    def test_content_dependencies_lookup(self):
+        queryset = h5p_contents_libraries.objects.filter(content_id=1, dependency_type='preloaded').order_by('weight')
+        self.assertUsesIndex(queryset, 'h5p_content_deps_idx')
+        print('test_content_dependencies_lookup ---- Check')
+
+    def test_content_slug_lookup(self):
+        queryset = h5p_contents.objects.filter(slug='contenttest').values('slug')
+        self.assertUsesIndex(queryset, 'sqlite_autoindex_h5p_contents')
+        print('test_content_slug_lookup ---- Check')
+
+    def test_user_data_reset_lookup(self):
+        queryset = h5p_content_user_data.objects.filter(content_main_id=1, delete_on_content_change=1)
+        self.assertUsesIndex(queryset, 'h5p_user_data_reset_idx')
+        print('test_user_data_reset_lookup ---- Check')
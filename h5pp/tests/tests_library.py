@@ -1,6 +1,7 @@
 from django.test import TestCase
 from django.conf import settings
 from h5pp.h5p.h5pclasses import H5PDjango
+from h5pp.h5p.library.H5PCore import H5PCore
 from h5pp.h5p.library.H5PDefaultStorage import H5PDefaultStorage
 from h5pp.h5p.editor.library.h5peditorstorage import H5PEditorStorage
 from h5pp.models import *
@@ -23,8 +24,8 @@ class CoreTestCase(TestCase):
 			runnable=1,
 			fullscreen=0,
 			embed_types='',
-			preloaded_js="[u'scripts/test.js']",
-			preloaded_css="[u'styles/test.css']",
+			preloaded_js=['scripts/test.js'],
+			preloaded_css=['styles/test.css'],
 			drop_library_css=None,
 			semantics='',
 			restricted=0,
@@ -107,6 +108,59 @@ class CoreTestCase(TestCase):
 		self.assertEqual(1, result['library_id'])
 		print('test_load_library ---- Check')
 
+	def test_generate_content_slug(self):
+		user = User.objects.get(username='titi')
+		interface = H5PDjango(user)
+		core = interface.h5pGetInstance('core')
+
+		for content_id, slug in [(1, 'content-test'), (2, 'content-test-2'), (3, 'content-test-9'), (4, 'content-test-x')]:
+			h5p_contents.objects.create(content_id=content_id, title='Content Test', json_contents='{}',
+				main_library_id=1, filtered='', slug=slug)
+
+		with self.assertNumQueries(1):
+			self.assertEqual('content-test-10', core.generate_content_slug({'title': 'Content Test'}))
+		self.assertEqual('other', core.generate_content_slug({'title': 'Other'}))
+		self.assertEqual('content-test-x-2', core.generate_content_slug({'title': 'Content Test X'}))
+		print('test_generate_content_slug ---- Check')
+
+	def test_get_assets_urls(self):
+		assets = [
+			{'path': 'libraries/H5P.Test-1.1/scripts/test.js', 'version': '?ver=1.1.2'},
+			{'path': 'https://example.com/test.js', 'version': '?ver=1.1.2'},
+			{'path': 'https://example.com/test.js?v=3', 'version': '?ver=1.1.2'},
+			{'path': 'libraries/H5P.Test-1.1/styles/test.css'},
+		]
+		self.assertEqual([
+			settings.MEDIA_URL + 'h5pp/libraries/H5P.Test-1.1/scripts/test.js?ver=1.1.2',
+			'https://example.com/test.js?ver=1.1.2',
+			'https://example.com/test.js?v=3&ver=1.1.2',
+			settings.MEDIA_URL + 'h5pp/libraries/H5P.Test-1.1/styles/test.css',
+		], H5PCore.get_assets_urls(assets))
+		print('test_get_assets_urls ---- Check')
+
+	def test_get_dependencies_files(self):
+		user = User.objects.get(username='titi')
+		interface = H5PDjango(user)
+		core = interface.h5pGetInstance('core')
+
+		library = {'machineName': 'H5P.Files', 'title': 'Files', 'majorVersion': 1, 'minorVersion': 0,
+			'patchVersion': 3, 'runnable': 1,
+			'preloadedJs': [{'path': "scripts/it's, here.js"}, {'path': 'scripts/main.js'}],
+			'preloadedCss': [{'path': 'styles/main.css'}]}
+		interface.save_library_data(library)
+		self.assertEqual(["scripts/it's, here.js", 'scripts/main.js'],
+			h5p_libraries.objects.get(library_id=library['libraryId']).preloaded_js)
+
+		h5p_contents_libraries.objects.create(content_id=1, library_id=library['libraryId'], weight=1)
+		files = core.get_dependencies_files(core.load_content_dependencies(1, 'preloaded'))
+		self.assertEqual([
+			{'path': "libraries/H5P.Files-1.0/scripts/it's, here.js", 'version': '?ver=1.0.3'},
+			{'path': 'libraries/H5P.Files-1.0/scripts/main.js', 'version': '?ver=1.0.3'},
+		], files['scripts'])
+		self.assertEqual([{'path': 'libraries/H5P.Files-1.0/styles/main.css', 'version': '?ver=1.0.3'}],
+			files['styles'])
+		print('test_get_dependencies_files ---- Check')
+
 class StorageTestCase(TestCase):
 
 	def setUp(self):
@@ -120,8 +174,8 @@ class StorageTestCase(TestCase):
 			runnable=1,
 			fullscreen=0,
 			embed_types='',
-			preloaded_js="[u'scripts/test.js']",
-			preloaded_css="[u'styles/test.css']",
+			preloaded_js=['scripts/test.js'],
+			preloaded_css=['styles/test.css'],
 			drop_library_css=None,
 			semantics='',
 			restricted=0,
@@ -182,8 +236,8 @@ class EditorStorageTestCase(TestCase):
 			runnable=1,
 			fullscreen=0,
 			embed_types='',
-			preloaded_js="[u'scripts/test.js']",
-			preloaded_css="[u'styles/test.css']",
+			preloaded_js=['scripts/test.js'],
+			preloaded_css=['styles/test.css'],
 			drop_library_css=None,
 			semantics='',
 			restricted=0,
@@ -209,6 +263,26 @@ class EditorStorageTestCase(TestCase):
 
 		self.assertTrue(result[0]['title'] == 'Test')
 		print('test_get_libraries ---- Check')
+
+	def test_get_libraries_queries(self):
+		editor = H5PEditorStorage()
+		libraries = [
+			{'name': 'H5P.Test', 'majorVersion': '1', 'minorVersion': '1'},
+			{'name': 'H5P.Test', 'majorVersion': '1', 'minorVersion': '2'},
+			{'name': 'H5P.Missing', 'majorVersion': '1', 'minorVersion': '0'},
+		]
+		with self.assertNumQueries(1):
+			result = editor.getLibraries(libraries)
+		self.assertEqual(['1'], [library['minorVersion'] for library in result])
+
+		editor.getLibraries()
+		with self.assertNumQueries(0):
+			self.assertEqual('Test', editor.getLibraries()[0]['title'])
+
+		h5p_libraries.objects.filter(library_id=1).update(title='Renamed')
+		h5p_libraries.objects.get(library_id=1).save()
+		self.assertEqual('Renamed', editor.getLibraries()[0]['title'])
+		print('test_get_libraries_queries ---- Check')
 ##
 # TODO
 # Place request-based test
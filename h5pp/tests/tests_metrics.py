@@ -0,0 +1,92 @@
+from django.test import TestCase
+from h5pp.h5p.editor.library.h5peditorstorage import H5PEditorStorage
+from h5pp.h5p.h5pmetrics import H5PMetrics, PrometheusSink, h5p_operation_measured
+from h5pp.models import h5p_libraries
+from unittest import mock
+
+##
+# Tests for the instrumentation of the H5P operations
+##
+
+
+class Instrumented:
+
+    def load(self):
+        return h5p_libraries.objects.count()
+
+    @classmethod
+    def read(cls):
+        H5PMetrics.count_bytes(read=10)
+
+    @staticmethod
+    def helper():
+        return True
+
+
+class MetricsTestCase(TestCase):
+
+    def setUp(self):
+        self.operations = list()
+        h5p_operation_measured.connect(self.receive, dispatch_uid='tests_metrics')
+        print('setUp of MetricsTestCase ---- Ready')
+
+    def tearDown(self):
+        h5p_operation_measured.disconnect(dispatch_uid='tests_metrics')
+        h5p_operation_measured.disconnect(dispatch_uid='h5pp_metrics_h5pp.h5p.h5pmetrics.PrometheusSink')
+        PrometheusSink.reset()
+
+    def receive(self, operation, **kwargs):
+        self.operations.append(operation)
+
+    def test_measure(self):
+        with H5PMetrics.measure('outer') as outer:
+            h5p_libraries.objects.count()
+            H5PMetrics.count_cache(hits=1)
+            with H5PMetrics.measure('inner') as inner:
+                h5p_libraries.objects.exists()
+                H5PMetrics.count_cache(misses=1)
+                H5PMetrics.count_bytes(read=10, written=5)
+
+        self.assertEqual(['inner', 'outer'], [operation['operation'] for operation in self.operations])
+        self.assertEqual((1, 0, 1, 10, 5), (inner['queries'], inner['cache_hits'], inner['cache_misses'],
+                                            inner['bytes_read'], inner['bytes_written']))
+        # Nested operations are included
+        self.assertEqual((2, 1, 1, 10), (outer['queries'], outer['cache_hits'], outer['cache_misses'],
+                                         outer['bytes_read']))
+        self.assertTrue(outer['duration'] >= inner['duration'] > 0)
+        self.assertFalse(H5PMetrics.active())
+        print('test_measure ---- Check')
+
+    def test_cache_counters(self):
+        H5PEditorStorage.invalidateLibraries()
+        with H5PMetrics.measure('libraries') as first:
+            H5PEditorStorage().getLibraries()
+        with H5PMetrics.measure('libraries') as second:
+            H5PEditorStorage().getLibraries()
+
+        self.assertEqual((0, 1), (first['cache_hits'], first['cache_misses']))
+        self.assertEqual((1, 0), (second['cache_hits'], second['cache_misses']))
+        self.assertEqual(0, second['queries'])
+        print('test_cache_counters ---- Check')
+
+    def test_setup(self):
+        with mock.patch.object(H5PMetrics, 'enabled', True), \
+                mock.patch.object(H5PMetrics, 'sinks', ['h5pp.h5p.h5pmetrics.PrometheusSink']):
+            H5PMetrics.setup(Instrumented)
+
+        self.assertEqual(0, Instrumented().load())
+        Instrumented().load()
+        Instrumented.read()
+        Instrumented.helper()
+
+        self.assertEqual(['Instrumented.load', 'Instrumented.load', 'Instrumented.read'],
+                         [operation['operation'] for operation in self.operations])
+        self.assertEqual(1, self.operations[0]['queries'])
+        self.assertEqual(10, self.operations[2]['bytes_read'])
+
+        metrics = PrometheusSink.render()
+        self.assertIn('# TYPE h5pp_operations_total counter', metrics)
+        self.assertIn('h5pp_operations_total{operation="Instrumented.load"} 2', metrics)
+        self.assertIn('h5pp_operation_queries_total{operation="Instrumented.load"} 2', metrics)
+        self.assertIn('h5pp_operation_read_bytes_total{operation="Instrumented.read"} 10', metrics)
+        print('test_setup ---- Check')
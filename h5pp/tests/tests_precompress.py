@@ -0,0 +1,109 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from h5pp.benchmarks.package import PackageBenchmark
+from h5pp.h5p.h5pclasses import H5PDjango
+from h5pp.h5p.library.H5PDefaultStorage import H5PDefaultStorage
+from io import StringIO
+from pathlib import Path
+import gzip
+import os
+import shutil
+import tempfile
+import zipfile
+
+##
+# Tests for the precompressed versions of the libraries text assets
+##
+
+
+class PrecompressTestCase(TestCase):
+
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp())
+        self.library = self.root / 'libraries' / 'H5P.Test-1.1'
+        self.create('scripts/test.js', 'var test = "test";\n' * 100)
+        self.create('styles/test.css', 'a')
+        self.create('images/test.png', 'png' * 100)
+        self.storage = H5PDefaultStorage(self.root)
+        print('setUp of PrecompressTestCase ---- Ready')
+
+    def tearDown(self):
+        shutil.rmtree(str(self.root), ignore_errors=True)
+
+    def create(self, path, data):
+        path = self.library / path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(data)
+
+    def test_precompress_dir(self):
+        self.assertEqual(1, self.storage.precompress_dir(self.library))
+
+        js = self.library / 'scripts' / 'test.js'
+        compressed = self.library / 'scripts' / 'test.js.gz'
+        self.assertEqual(js.read_bytes(), gzip.decompress(compressed.read_bytes()))
+        self.assertEqual(js.stat().st_mtime, compressed.stat().st_mtime)
+        # Compression doesn't help the tiny stylesheet, images are already compressed
+        self.assertFalse((self.library / 'styles' / 'test.css.gz').exists())
+        self.assertFalse((self.library / 'images' / 'test.png.gz').exists())
+
+        # Up to date siblings are left alone
+        self.assertEqual(0, self.storage.precompress_dir(self.library))
+        self.assertEqual(1, self.storage.precompress_dir(self.library, force=True))
+        print('test_precompress_dir ---- Check')
+
+    def test_stale_sibling_is_removed(self):
+        self.create('styles/test.css.gz', 'stale')
+        self.storage.precompress_dir(self.library)
+        self.assertFalse((self.library / 'styles' / 'test.css.gz').exists())
+        print('test_stale_sibling_is_removed ---- Check')
+
+    def test_command(self):
+        out = StringIO()
+        with self.settings(H5P_STORAGE_ROOT=str(self.root)):
+            call_command('h5p_precompress_libraries', stdout=out)
+
+        self.assertIn('1 compressed files written.', out.getvalue())
+        self.assertTrue(os.path.exists(str(self.library / 'scripts' / 'test.js.gz')))
+        print('test_command ---- Check')
+
+
+class PrecompressExportTestCase(TestCase):
+
+    def setUp(self):
+        self.benchmark = PackageBenchmark(libraries=2, files=1, media_size=64)
+        self.benchmark.root = Path(settings.H5P_STORAGE_ROOT)
+        self.benchmark.user = User.objects.create(username='titi')
+        # Library names not used by the other tests
+        self.benchmark.packages = 200
+        print('setUp of PrecompressExportTestCase ---- Ready')
+
+    def tearDown(self):
+        for path in self.benchmark.created:
+            if path.is_dir():
+                shutil.rmtree(str(path), ignore_errors=True)
+            elif path.exists():
+                path.unlink()
+
+    def test_export_precompressed_library(self):
+        self.benchmark.install()
+        self.benchmark.save_package()
+        library = self.benchmark.root / 'libraries' / 'H5P.PackageBenchmark201x0-1.0'
+        self.assertTrue((library / 'scripts' / 'benchmark.js.gz').exists())
+
+        self.benchmark.load_content()
+        self.assertTrue(self.benchmark.export.create_export_file(self.benchmark.content))
+        export = self.benchmark.created[-1]
+        with zipfile.ZipFile(str(export)) as package:
+            names = package.namelist()
+        self.assertIn('H5P.PackageBenchmark201x0-1.0/scripts/benchmark.js', names)
+        self.assertFalse([name for name in names if name.endswith(('.gz', '.br'))])
+
+        # The exported package is valid again
+        folder = Path(tempfile.mkdtemp(dir=str(self.benchmark.root / 'tmp')))
+        self.benchmark.created.append(folder)
+        shutil.copy(str(export), str(folder / 'export.h5p'))
+        validator = H5PDjango(self.benchmark.user).h5pGetInstance('validator', folder, folder / 'export.h5p')
+        self.assertTrue(validator.is_valid_package(False, False))
+        print('test_export_precompressed_library ---- Check')
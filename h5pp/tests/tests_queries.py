@@ -0,0 +1,206 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, RequestFactory
+from django.urls import reverse
+from h5pp.h5p.h5pclasses import H5PDjango
+from h5pp.h5p.editor.library.h5peditorstorage import H5PEditorStorage
+from h5pp.models import *
+from h5pp.views import librariesView
+import time
+
+##
+# Query count, statement text and timing regression tests for the raw SQL
+# of the framework and editor storage classes
+##
+
+# Upper bound for 50 calls of a single method, on the in-memory test database
+MAX_SECONDS = 2.0
+
+
+class StatementRecorder:
+
+    def __init__(self):
+        self.statements = list()
+
+    def __call__(self, execute, sql, params, many, context):
+        self.statements.append((sql, params))
+        return execute(sql, params, many, context)
+
+
+class RawQueriesTestCase(TestCase):
+
+    def setUp(self):
+        for library_id, name in [(1, 'H5P.Test'), (2, 'H5P.Test2')]:
+            h5p_libraries.objects.create(
+                library_id=library_id,
+                machine_name=name,
+                title=name,
+                major_version=1,
+                minor_version=1,
+                patch_version=2,
+                runnable=1,
+                fullscreen=0,
+                embed_types='',
+                preloaded_js=["scripts/test.js"],
+                preloaded_css=["styles/test.css"],
+                drop_library_css=None,
+                semantics='',
+                restricted=0,
+                tutorial_url=''
+            )
+            h5p_libraries_languages.objects.create(library_id=library_id, language_code='en', language_json='{}')
+            h5p_contents.objects.create(
+                content_id=library_id,
+                title='ContentTest',
+                json_contents='{}',
+                main_library_id=library_id,
+                filtered='',
+                slug='contenttest-%s' % library_id
+            )
+            h5p_contents_libraries.objects.create(content_id=library_id, library_id=library_id)
+        h5p_libraries_libraries.objects.create(library_id=1, required_library_id=2, dependency_type='preloaded')
+        self.interface = H5PDjango(User.objects.create(username='titi'))
+        print('setUp of RawQueriesTestCase ---- Ready')
+
+    def assertStableStatement(self, num_queries, calls):
+        """
+        Every call must run num_queries queries, and all calls must share the same
+        statement texts so the database can reuse its prepared plans.
+        """
+        statements = list()
+        for call in calls:
+            recorder = StatementRecorder()
+            with self.assertNumQueries(num_queries), connection.execute_wrapper(recorder):
+                call()
+            statements.append([sql for sql, params in recorder.statements])
+
+        for other in statements[1:]:
+            self.assertEqual(statements[0], other)
+
+        start = time.perf_counter()
+        for i in range(0, 50):
+            calls[0]()
+        self.assertLess(time.perf_counter() - start, MAX_SECONDS)
+
+    def test_load_library(self):
+        self.assertStableStatement(3, [
+            lambda: self.interface.loadLibrary('H5P.Test', 1, 1),
+            lambda: self.interface.loadLibrary('H5P.Test2', 1, 1),
+        ])
+        self.assertEqual('H5P.Test2',
+                         self.interface.loadLibrary('H5P.Test', 1, 1)['preloadedDependencies'][0]['machineName'])
+        print('test_load_library ---- Check')
+
+    def test_load_content(self):
+        self.assertStableStatement(1, [
+            lambda: self.interface.loadContent(1),
+            lambda: self.interface.loadContent(2),
+        ])
+        self.assertEqual('H5P.Test2', self.interface.loadContent(2)['library_name'])
+        self.assertEqual(None, self.interface.loadContent("1 OR 1=1"))
+        print('test_load_content ---- Check')
+
+    def test_load_content_dependencies(self):
+        self.assertStableStatement(1, [
+            lambda: self.interface.loadContentDependencies(1, 'preloaded'),
+            lambda: self.interface.loadContentDependencies(2, 'dynamic'),
+        ])
+        self.assertStableStatement(1, [
+            lambda: self.interface.loadContentDependencies(1),
+            lambda: self.interface.loadContentDependencies(2),
+        ])
+        self.assertEqual([1], list(self.interface.loadContentDependencies(1, 'preloaded').keys()))
+        print('test_load_content_dependencies ---- Check')
+
+    def test_get_library_usage(self):
+        self.assertStableStatement(2, [
+            lambda: self.interface.getLibraryUsage(1),
+            lambda: self.interface.getLibraryUsage(2),
+        ])
+        self.assertEqual(1, self.interface.getLibraryUsage(2)['libraries'])
+        print('test_get_library_usage ---- Check')
+
+    def test_get_language(self):
+        storage = H5PEditorStorage()
+        self.assertStableStatement(1, [
+            lambda: storage.getLanguage('H5P.Test', 1, 1, 'en'),
+            lambda: storage.getLanguage('H5P.Test2', 1, 1, 'fr'),
+        ])
+        self.assertEqual('{}', storage.getLanguage('H5P.Test', 1, 1, 'en'))
+        self.assertFalse(storage.getLanguage("H5P.Test' OR '1'='1", 1, 1, 'en'))
+        print('test_get_language ---- Check')
+
+    def test_get_languages(self):
+        h5p_libraries_languages.objects.create(library_id=1, language_code='fr', language_json='{"label": "Titre"}')
+        storage = H5PEditorStorage()
+        libraries = [('H5P.Test', 1, 1), ('H5P.Test2', '1', '1'), ('H5P.Missing', 1, 0)]
+
+        with self.assertNumQueries(1):
+            languages = storage.getLanguages(libraries, 'fr')
+        self.assertEqual({'label': 'Titre'}, languages[('H5P.Test', 1, 1)])
+        self.assertEqual({}, languages[('H5P.Test2', '1', '1')])
+        self.assertEqual(None, languages[('H5P.Missing', 1, 0)])
+
+        with self.assertNumQueries(0):
+            storage.getLanguages(libraries, 'fr')
+
+        h5p_libraries_languages.objects.filter(library_id=1, language_code='fr').delete()
+        self.assertEqual({}, storage.getLanguages(libraries, 'fr')[('H5P.Test', 1, 1)])
+        print('test_get_languages ---- Check')
+
+
+class LeanQueriesTestCase(TestCase):
+    """
+    The listing paths must not load the large columns of the libraries and the contents
+    """
+    heavy_columns = ('semantics', 'preloaded_js', 'preloaded_css', 'json_contents', 'filtered')
+
+    def setUp(self):
+        h5p_libraries.objects.create(library_id=1, machine_name='H5P.Test', title='Test', major_version=1,
+                                     minor_version=1, patch_version=2, runnable=1, preloaded_js=['scripts/test.js'],
+                                     preloaded_css=['styles/test.css'], semantics='[]', tutorial_url='')
+        h5p_contents.objects.create(content_id=1, title='ContentTest', json_contents='{}', main_library_id=1,
+                                    filtered='{}', slug='contenttest')
+        self.user = User.objects.create(username='titi', is_staff=True, is_superuser=True)
+        self.interface = H5PDjango(self.user)
+        print('setUp of LeanQueriesTestCase ---- Ready')
+
+    def assertLeanQueries(self, call, num_queries=None):
+        recorder = StatementRecorder()
+        with connection.execute_wrapper(recorder):
+            result = call()
+        for sql, params in recorder.statements:
+            for column in self.heavy_columns:
+                self.assertNotIn(column, sql)
+        if num_queries is not None:
+            self.assertEqual(num_queries, len(recorder.statements))
+        return result
+
+    def test_libraries_view(self):
+        request = RequestFactory().get('/h5p/libraries/')
+        request.user = self.user
+        response = self.assertLeanQueries(lambda: librariesView(request))
+        self.assertContains(response, 'H5P.Test')
+        print('test_libraries_view ---- Check')
+
+    def test_admin_changelists(self):
+        self.client.force_login(self.user)
+        for model, title in [('h5p_libraries', 'Test'), ('h5p_contents', 'ContentTest')]:
+            url = reverse('admin:h5pp_%s_changelist' % model)
+            response = self.assertLeanQueries(lambda: self.client.get(url))
+            self.assertContains(response, title)
+
+        # The change form loads the whole row
+        response = self.client.get(reverse('admin:h5pp_h5p_libraries_change', args=[1]))
+        self.assertContains(response, 'scripts/test.js')
+        print('test_admin_changelists ---- Check')
+
+    def test_load_all_contents(self):
+        contents = self.assertLeanQueries(self.interface.loadAllContents, 1)
+        self.assertEqual([{'content_id': 1, 'title': 'ContentTest'}], list(contents))
+        print('test_load_all_contents ---- Check')
+
+    def test_get_library_content_count(self):
+        count = self.assertLeanQueries(self.interface.getLibraryContentCount, 1)
+        self.assertEqual({'H5P.Test 1.1': 1}, count)
+        print('test_get_library_content_count ---- Check')
@@ -0,0 +1,126 @@
+from django.core.management import call_command
+from django.core.signals import request_started
+from django.test import TestCase
+from h5pp.h5p.h5preaper import H5PReaper
+from h5pp.models import h5p_contents
+from io import StringIO
+import json
+import os
+import shutil
+import tempfile
+from unittest import mock
+import time
+
+##
+# Tests for the removal of orphaned editor uploads and abandoned tmp files
+##
+
+
+class H5PReaperTestCase(TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        old = time.time() - 2 * 86400
+        for path in ['editor/images/used.png', 'editor/images/orphan.png', 'editor/videos/orphan.mp4',
+                     'tmp/upload.h5p', 'tmp/1234/content/content.json']:
+            self.create(path, old)
+        os.utime(os.path.join(self.root, 'tmp', '1234'), (old, old))
+        self.create('editor/images/recent.png')
+        self.create('tmp/recent.h5p')
+
+        h5p_contents.objects.create(
+            content_id=1,
+            title='ContentTest',
+            json_contents=json.dumps({'media': {'params': {'file': {'path': 'images/used.png#tmp'}}}}),
+            main_library_id=1,
+            filtered='',
+            slug='contenttest'
+        )
+        print('setUp of H5PReaperTestCase ---- Ready')
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def create(self, path, mtime=None):
+        path = os.path.join(self.root, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write('test')
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+
+    def exists(self, path):
+        return os.path.exists(os.path.join(self.root, path))
+
+    def test_dry_run(self):
+        removed = H5PReaper(self.root, dry_run=True).run()
+
+        self.assertEqual(['orphan.png', 'orphan.mp4'], [os.path.basename(path) for path in removed['editor']])
+        self.assertEqual(['1234', 'upload.h5p'], sorted(os.path.basename(path) for path in removed['tmp']))
+        self.assertTrue(self.exists('editor/images/orphan.png'))
+        self.assertTrue(self.exists('tmp/1234'))
+        print('test_dry_run ---- Check')
+
+    def test_run(self):
+        H5PReaper(self.root, batch_size=1).run()
+
+        self.assertTrue(self.exists('editor/images/used.png'))
+        self.assertTrue(self.exists('editor/images/recent.png'))
+        self.assertFalse(self.exists('editor/images/orphan.png'))
+        self.assertFalse(self.exists('editor/videos/orphan.mp4'))
+        self.assertTrue(self.exists('tmp/recent.h5p'))
+        self.assertFalse(self.exists('tmp/upload.h5p'))
+        self.assertFalse(self.exists('tmp/1234'))
+        print('test_run ---- Check')
+
+    def test_saved_uploads(self):
+        # Saved before the editor moved its uploads: the content has its own copy
+        self.create('content/1/images/used.png')
+        self.create('editor/images/shared.png', time.time() - 2 * 86400)
+        for contentId in [2, 3]:
+            h5p_contents.objects.create(content_id=contentId, title='ContentTest', main_library_id=1, filtered='',
+                                        json_contents=json.dumps({'file': {'path': 'images/shared.png'}}),
+                                        slug='contenttest-%s' % contentId)
+        self.create('content/2/images/shared.png')
+
+        H5PReaper(self.root).run()
+        self.assertFalse(self.exists('editor/images/used.png'))
+        # Content 3 still uses the editor upload
+        self.assertTrue(self.exists('editor/images/shared.png'))
+
+        self.create('content/3/images/shared.png')
+        H5PReaper(self.root).run()
+        self.assertFalse(self.exists('editor/images/shared.png'))
+        self.assertTrue(self.exists('content/1/images/used.png'))
+        print('test_saved_uploads ---- Check')
+
+    def test_limit(self):
+        removed = H5PReaper(self.root).run(limit=1)
+
+        self.assertEqual(1, len(removed['editor']))
+        self.assertEqual(1, len(removed['tmp']))
+        print('test_limit ---- Check')
+
+    def test_command(self):
+        out = StringIO()
+        with self.settings(H5P_STORAGE_ROOT=self.root):
+            reaper = H5PReaper(dry_run=True)
+            call_command('h5p_reap_files', '--dry-run', stdout=out)
+
+        self.assertEqual(self.root, str(reaper.root))
+        self.assertIn('2 editor entries would be deleted.', out.getvalue())
+        self.assertTrue(self.exists('tmp/upload.h5p'))
+        print('test_command ---- Check')
+
+    def test_periodic_run(self):
+        self.assertIn(H5PReaper.autostart, [receiver() for key, receiver in request_started.receivers])
+
+        with self.settings(H5P_STORAGE_ROOT=self.root):
+            H5PReaper.run_periodic()
+        self.assertFalse(self.exists('tmp/upload.h5p'))
+
+        with mock.patch.object(H5PReaper, 'run', side_effect=OSError('Disk failure')):
+            with self.assertLogs('h5pp.h5p.h5preaper', 'ERROR') as logs:
+                H5PReaper.run_periodic()
+        self.assertIn('Disk failure', logs.output[0])
+        print('test_periodic_run ---- Check')
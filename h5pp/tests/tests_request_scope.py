@@ -0,0 +1,90 @@
+from django.contrib.auth.models import AnonymousUser, User
+from django.http import HttpResponse
+from django.test import TestCase, RequestFactory
+from h5pp.h5p import h5pclasses
+from h5pp.h5p.h5pclasses import H5PDjango
+from h5pp.h5p.h5pmodule import h5p_load, include_h5p
+from h5pp.middleware import H5PRequestMiddleware
+from h5pp.models import h5p_contents, h5p_libraries
+from unittest import mock
+
+##
+# Tests for the framework instances shared by the calls of a request
+##
+
+
+class RequestScopeTestCase(TestCase):
+
+    def setUp(self):
+        h5p_libraries.objects.create(
+            library_id=1,
+            machine_name='H5P.Test',
+            title='Test',
+            major_version=1,
+            minor_version=1,
+            patch_version=2,
+            runnable=1,
+            fullscreen=0,
+            embed_types='div',
+            preloaded_js=[],
+            preloaded_css=[],
+            drop_library_css=None,
+            semantics='[]',
+            restricted=0,
+            tutorial_url=''
+        )
+        h5p_contents.objects.create(
+            content_id=1,
+            title='ContentTest',
+            json_contents='{}',
+            embed_type='div',
+            main_library_id=1,
+            filtered='{}',
+            slug='contenttest'
+        )
+        self.titi = User.objects.create(username='titi')
+        self.toto = User.objects.create(username='toto')
+        print('setUp of RequestScopeTestCase ---- Ready')
+
+    def test_for_user(self):
+        self.assertIsNot(H5PDjango.forUser(self.titi), H5PDjango.forUser(self.titi))
+
+        with H5PDjango.requestScope():
+            framework = H5PDjango.forUser(self.titi)
+            self.assertIs(framework, H5PDjango.forUser(self.titi))
+            self.assertIsNot(framework, H5PDjango.forUser(self.toto))
+            self.assertIs(framework.h5pGetInstance('core'), H5PDjango.forUser(self.titi).h5pGetInstance('core'))
+            self.assertIs(framework, framework.h5pGetInstance('interface'))
+
+        self.assertIsNot(framework, H5PDjango.forUser(self.titi))
+        print('test_for_user ---- Check')
+
+    def test_middleware(self):
+        frameworks = list()
+
+        def view(request):
+            frameworks.append(H5PDjango.forUser(request.user))
+            frameworks.append(H5PDjango.forUser(request.user))
+            return HttpResponse('content')
+
+        request = RequestFactory().get('/h5p/content/1/')
+        request.user = AnonymousUser()
+        H5PRequestMiddleware(view)(request)
+        H5PRequestMiddleware(view)(request)
+
+        self.assertIs(frameworks[0], frameworks[1])
+        self.assertIsNot(frameworks[1], frameworks[2])
+        print('test_middleware ---- Check')
+
+    def test_core_is_built_once(self):
+        def view(request):
+            h5p_load(request)
+            include_h5p(request)
+            return HttpResponse('content')
+
+        request = RequestFactory().get('/h5p/content/1/', {'contentId': '1'})
+        request.user = self.titi
+        with mock.patch.object(h5pclasses, 'H5PCore', wraps=h5pclasses.H5PCore) as core:
+            H5PRequestMiddleware(view)(request)
+        self.assertEqual(1, core.call_count)
+        print('test_core_is_built_once ---- Check')
@@ -4,21 +4,27 @@ from django.urls import reverse
 from django.core.files.base import ContentFile
 from django.shortcuts import render
 from django.http import HttpResponse, HttpResponseRedirect, HttpResponseForbidden, Http404
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
 from django.views.decorators.csrf import csrf_exempt
 from django.views.generic import (FormView, CreateView, TemplateView)
+import hashlib
 
 from .forms import LibrariesForm, CreateForm
 from .models import h5p_libraries, h5p_contents, h5p_content_user_data, h5p_points
 from h5pp.h5p.h5pmodule import (include_h5p, h5p_set_started, h5p_set_finished, h5p_get_content_id, h5p_get_list_content, h5p_load,
-                                h5p_delete, h5p_embed, get_user_score, uninstall, export_score)
+                                h5p_delete, h5p_embed, get_user_score, uninstall, export_score, valid_token,
+                                h5p_get_content_validators)
 from h5pp.h5p.h5pclasses import H5PDjango
-from h5pp.h5p.editor.h5peditormodule import (h5peditorContent, handleContentUserData)
+from h5pp.h5p.editor.h5peditormodule import (h5peditorContent, handleContentUserData, ajaxError)
 from h5pp.h5p.editor.library.h5peditorfile import H5PEditorFile
 
 
 def librariesView(request):
     if request.user.is_authenticated and request.user.is_superuser:
-        libraries = h5p_libraries.objects.all()
+        # Columns of the list, the semantics and assets lists of the libraries are not loaded
+        libraries = h5p_libraries.objects.only('library_id', 'machine_name', 'major_version', 'minor_version',
+                                               'tutorial_url')
         if request.method == 'POST':
             form = LibrariesForm(request.user, request.POST, request.FILES)
             if form.is_valid():
@@ -84,7 +90,7 @@ class UpdateContentView(FormView):
     form_class = CreateForm
 
     def get_form_kwargs(self):
-        framework = H5PDjango(self.request.user)
+        framework = H5PDjango.forUser(self.request.user)
         edit = framework.loadContent(self.kwargs.get("content_id"))
         self.request.GET = self.request.GET.copy()
         self.request.GET['contentId'] = self.kwargs.get("content_id")
@@ -142,7 +148,7 @@ def createView(request, contentId=None):
             return render(request, 'h5p/create.html', {'form': form, 'data': editor})
 
         elif contentId is not None:
-            framework = H5PDjango(request.user)
+            framework = H5PDjango.forUser(request.user)
             edit = framework.loadContent(contentId)
             request.GET = request.GET.copy()
             request.GET['contentId'] = contentId
@@ -160,6 +166,14 @@ def createView(request, contentId=None):
 class ContentDetailView(TemplateView):
     template_name = "h5p/content.html"
 
+    def get(self, request, *args, **kwargs):
+        contentId = self.kwargs.get("content_id")
+        h5p_set_started(request.user, contentId)
+
+        validators = h5p_get_content_validators(contentId, request.user)
+        return conditionalResponse(request, validators,
+                                   lambda: super(ContentDetailView, self).get(request, *args, **kwargs))
+
     def get_context_data(self, **kwargs):
         ctx = super(ContentDetailView, self).get_context_data(**kwargs)
 
@@ -167,7 +181,6 @@ class ContentDetailView(TemplateView):
         self.request.GET["contentId"] = self.kwargs.get("content_id")
         h5p_load(self.request)
         content = include_h5p(self.request)
-        h5p_set_started(self.request.user, self.kwargs.get("content_id"))
         score = get_user_score(self.kwargs.get("content_id"), self.request.user)
 
         if "html" not in content:
@@ -186,7 +199,7 @@ class ContentDetailView(TemplateView):
 def contentsView(request):
     if 'contentId' in request.GET:
         try:
-            owner = h5p_contents.objects.get(content_id=h5p_get_content_id(request))
+            owner = h5p_contents.objects.only('author').get(content_id=h5p_get_content_id(request))
         except:
             raise Http404
         h5p_load(request)
@@ -227,7 +240,7 @@ def listView(request):
 
 def scoreView(request, contentId):
     try:
-        content = h5p_contents.objects.get(content_id=contentId)
+        content = h5p_contents.objects.only('title', 'author').get(content_id=contentId)
     except:
         raise Http404
     if request.user.is_authenticated:
@@ -285,13 +298,19 @@ def scoreView(request, contentId):
 
 def embedView(request):
     if 'contentId' in request.GET:
-        h5p_load(request)
-        embed = h5p_embed(request)
-        score = None
+        def renderEmbed():
+            h5p_load(request)
+            embed = h5p_embed(request)
+            score = None
+            if request.user.is_authenticated:
+                score = get_user_score(request.GET['contentId'], request.user)[0]
+            return render(request, 'h5p/embed.html', {'embed': embed, 'score': score})
+
         if request.user.is_authenticated:
             h5p_set_started(request.user, h5p_get_content_id(request))
-            score = get_user_score(request.GET['contentId'], request.user)[0]
-        return render(request, 'h5p/embed.html', {'embed': embed, 'score': score})
+
+        validators = h5p_get_content_validators(h5p_get_content_id(request), request.user)
+        return conditionalResponse(request, validators, renderEmbed)
 
     return HttpResponseForbidden()
 
@@ -301,12 +320,12 @@ def editorAjax(request, contentId):
     data = None
     if request.method == 'POST':
         if 'libraries' in request.GET:
-            framework = H5PDjango(request.user)
+            framework = H5PDjango.forUser(request.user)
             editor = framework.h5pGetInstance('editor')
             data = editor.getLibraries(request)
             return HttpResponse(data, content_type='application/json')
         elif 'file' in request.FILES:
-            framework = H5PDjango(request.user)
+            framework = H5PDjango.forUser(request.user)
             f = H5PEditorFile(request, request.FILES, framework)
             if not f.isLoaded():
                 return HttpResponse('File Not Found', content_type='application/json')
@@ -323,26 +342,87 @@ def editorAjax(request, contentId):
         major = request.GET['majorVersion'] if 'majorVersion' in request.GET else 0
         minor = request.GET['minorVersion'] if 'minorVersion' in request.GET else 0
 
-        framework = H5PDjango(request.user)
+        framework = H5PDjango.forUser(request.user)
         editor = framework.h5pGetInstance('editor')
         if name != '':
-            data = editor.getLibraryData(name, major, minor, settings.H5P_LANGUAGE)
-            return HttpResponse(data, content_type='application/json')
+            data = editor.getCachedLibraryData(name, major, minor, settings.H5P_LANGUAGE)
+            return libraryDataResponse(request, data)
         else:
             data = editor.getLibraries(request)
-            return HttpResponse(data, content_type='application/json')
+            return conditionalResponse(request, bodyValidators(data),
+                                       lambda: HttpResponse(data, content_type='application/json'))
 
     return HttpResponse(data, content_type='application/json')
 
 
+##
+# Serve a cached editor library payload, gzipped when the client accepts it. Each
+# encoding has its own etag, a request is only answered with a 304 when it holds the
+# etag of the encoding it would get.
+##
+def libraryDataResponse(request, data):
+    gzipped = 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+    etag = '"%s%s"' % (data['etag'], '-gzip' if gzipped else '')
+    lastModified = int(data['last_modified'])
+    response = get_conditional_response(request, etag=etag, last_modified=lastModified)
+    if response is None:
+        if gzipped:
+            response = HttpResponse(data['gzip'], content_type='application/json')
+            response['Content-Encoding'] = 'gzip'
+        else:
+            response = HttpResponse(data['data'], content_type='application/json')
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(lastModified)
+    patch_vary_headers(response, ['Accept-Encoding'])
+    patch_cache_control(response, max_age=0, must_revalidate=True)
+    return response
+
+
+##
+# Answer a conditional GET with a 304 when the validators (etag and last modified
+# timestamp) match the request, render the response otherwise. Responses carry the
+# validators and must be revalidated before each use.
+##
+def conditionalResponse(request, validators, renderResponse):
+    response = None
+    if validators is not None and request.method in ('GET', 'HEAD'):
+        response = get_conditional_response(request, etag=validators['etag'],
+                                            last_modified=validators['last_modified'])
+    if response is None:
+        response = renderResponse()
+
+    if validators is not None:
+        response['ETag'] = validators['etag']
+        if validators['last_modified']:
+            response['Last-Modified'] = http_date(validators['last_modified'])
+    patch_cache_control(response, max_age=0, must_revalidate=True, private=request.user.is_authenticated)
+    return response
+
+
+##
+# Validators for a response built before checking them, the etag is a hash of its body
+##
+def bodyValidators(body):
+    if body is None:
+        return None
+    if isinstance(body, str):
+        body = body.encode('utf8')
+    return {'etag': '"%s"' % hashlib.md5(body).hexdigest(), 'last_modified': None}
+
+
 @csrf_exempt
 def ajax(request):
     if request.method == 'POST':
         if 'content-user-data' in request.GET:
+            if not valid_token('contentuserdata', request.GET.get('token'), request.user):
+                return invalidTokenResponse()
             data = handleContentUserData(request)
             return HttpResponse(data, content_type='application/json')
 
         elif 'setFinished' in request.GET:
+            if not valid_token('result', request.GET.get('token'), request.user):
+                return invalidTokenResponse()
             data = h5p_set_finished(request)
             return HttpResponse(data, content_type='application/json')
 
@@ -352,5 +432,10 @@ def ajax(request):
 
     elif 'user-scores' in request.GET:
         score = get_user_score(request.GET['user-scores'], None, True)
-        return HttpResponse(score, content_type='application/json')
+        return conditionalResponse(request, bodyValidators(score),
+                                   lambda: HttpResponse(score, content_type='application/json'))
     return HttpResponseRedirect('/h5p/create')
+
+
+def invalidTokenResponse():
+    return HttpResponseForbidden(ajaxError('Invalid security token'), content_type='application/json')